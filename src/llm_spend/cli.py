@@ -4,26 +4,25 @@ CLI entry point for llm-spend.
 
 from __future__ import annotations
 
+import functools
 from datetime import datetime
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
 import click
-from rich.console import Console
-
-from llm_spend.pricing import PRICING
-from llm_spend.reporter import (
-    console,
-    list_models,
-    report_by_file,
-    report_by_function,
-    report_by_label,
-    report_by_model,
-    report_summary,
-)
-from llm_spend.store import SpendStore
 
-_store = SpendStore()
-err_console = Console(stderr=True)
+if TYPE_CHECKING:
+    from llm_spend.store import SpendStore
+
+# Rich, the reporter and the store are imported inside each command so that
+# ``--help``/``--version`` start fast and never touch the database.
+
+
+@functools.lru_cache(maxsize=None)
+def _get_store() -> SpendStore:
+    """Read-only store shared by report, summary and export."""
+    from llm_spend.store import SpendStore
+
+    return SpendStore(readonly=True)
 
 
 @click.group()
@@ -55,21 +54,30 @@ def main() -> None:
 )
 def report(group_by: str, days: int) -> None:
     """Show a cost breakdown report."""
+    from llm_spend.reporter import (
+        get_console,
+        report_by_file,
+        report_by_function,
+        report_by_label,
+        report_by_model,
+    )
+
+    store = _get_store()
     if group_by == "file":
-        data = _store.get_by_file(days=days)
+        data = store.get_by_file(days=days)
         report_by_file(data)
     elif group_by == "function":
-        data = _store.get_by_function(days=days)
+        data = store.get_by_function(days=days)
         report_by_function(data)
     elif group_by == "label":
-        data = _store.get_by_label(days=days)
+        data = store.get_by_label(days=days)
         report_by_label(data)
     else:
-        data = _store.get_by_model(days=days)
+        data = store.get_by_model(days=days)
         report_by_model(data)
 
     if not data:
-        console.print("[dim]No records found for the selected period.[/dim]")
+        get_console().print("[dim]No records found for the selected period.[/dim]")
 
 
 # ------------------------------------------------------------------
@@ -81,12 +89,11 @@ def report(group_by: str, days: int) -> None:
 @click.option("--days", default=30, show_default=True, type=int)
 def summary(days: int) -> None:
     """Show a quick total + top consumers panel."""
-    total = _store.get_total(days=days)
-    files = _store.get_by_file(days=days)
-    models = _store.get_by_model(days=days)
+    from llm_spend.reporter import report_summary
 
-    top_file = files[0]["file"] if files else "(none)"
-    top_model = models[0]["model"] if models else "(none)"
+    total = _get_store().get_summary(days=days)
+    top_file = total["top_file"] or "(none)"
+    top_model = total["top_model"] or "(none)"
     report_summary(total, top_file=top_file, top_model=top_model, days=days)
 
 
@@ -113,8 +120,11 @@ def clear(days: Optional[int], yes: bool) -> None:
     if not yes:
         click.confirm(f"{msg}  Continue?", abort=True)
 
-    deleted = _store.clear(days=days)
-    console.print(f"[green]Deleted {deleted} record(s).[/green]")
+    from llm_spend.reporter import get_console
+    from llm_spend.store import SpendStore
+
+    deleted = SpendStore().clear(days=days)
+    get_console().print(f"[green]Deleted {deleted} record(s).[/green]")
 
 
 # ------------------------------------------------------------------
@@ -137,12 +147,14 @@ def export(fmt: str, output: Optional[str]) -> None:
         ts = datetime.now().strftime("%Y%m%d_%H%M%S")
         output = f"llm_spend_{ts}.{fmt}"
 
+    from llm_spend.reporter import get_console
+
     if fmt == "csv":
-        count = _store.export_csv(output)
+        count = _get_store().export_csv(output)
     else:
-        count = _store.export_json(output)
+        count = _get_store().export_json(output)
 
-    console.print(f"[green]Exported {count} record(s) to {output}[/green]")
+    get_console().print(f"[green]Exported {count} record(s) to {output}[/green]")
 
 
 # ------------------------------------------------------------------
@@ -153,4 +165,7 @@ def export(fmt: str, output: Optional[str]) -> None:
 @main.command()
 def models() -> None:
     """List all supported models with their pricing."""
+    from llm_spend.pricing import PRICING
+    from llm_spend.reporter import list_models
+
     list_models(PRICING)
@@ -4,7 +4,23 @@ Pricing tables for LLM providers (per million tokens).
 
 from __future__ import annotations
 
-PRICING: dict[str, dict[str, float]] = {
+import functools
+import re
+from types import MappingProxyType
+from typing import Any, Mapping, Optional, Sequence
+
+# Distinct model strings remembered by the lookup caches.  Processes see few
+# distinct names, so this comfortably holds every name they will use.
+_CACHE_SIZE = 2048
+
+# Minimum rapidfuzz ratio (0-100) for a near-miss spelling to match.  Matches
+# must also have the same digits: model families differ mostly by version
+# number (o1/o3, gemini-1.5/2.5), and those are different prices.
+_FUZZY_SCORE_CUTOFF = 85
+
+# Frozen below: the lookup tables and caches in this module are built from it
+# once, so it is extended by editing this table, not by mutating it at runtime.
+_PRICING: dict[str, dict[str, float]] = {
     # Anthropic
     "claude-3-5-sonnet-20241022": {"input": 3.00, "output": 15.00},
     "claude-3-5-haiku-20241022": {"input": 0.80, "output": 4.00},
@@ -21,52 +37,220 @@ PRICING: dict[str, dict[str, float]] = {
     "gemini-1.5-flash": {"input": 0.075, "output": 0.30},
     "gemini-2.0-flash": {"input": 0.10, "output": 0.40},
 }
+PRICING: Mapping[str, Mapping[str, float]] = MappingProxyType(
+    {model: MappingProxyType(prices) for model, prices in _PRICING.items()}
+)
 
 # Pre-sorted list of known model names from longest to shortest for greedy matching.
 _SORTED_MODELS = sorted(PRICING.keys(), key=len, reverse=True)
 
 
-def get_model_pricing(model: str) -> dict[str, float]:
-    """Get pricing for a model, with fuzzy matching for partial names.
+class _PricingTrie:
+    """Character trie over model-name keys for prefix and substring lookup.
 
-    Matching priority (most-specific first):
-    1. Exact match
-    2. Known model name is a substring of the given model string (longest match first)
-    3. Given model string is a substring of a known model name (longest match first)
+    ``keys`` is either a sequence of names (each maps to itself) or a mapping
+    from key to the value returned when that key matches.
     """
+
+    _END = ""  # key under which a node stores the value of the key ending there
+
+    def __init__(self, keys: Sequence[str] | Mapping[str, str]) -> None:
+        items = keys.items() if isinstance(keys, Mapping) else ((k, k) for k in keys)
+        self._root: dict[str, Any] = {}
+        for key, value in items:
+            node = self._root
+            for ch in key:
+                node = node.setdefault(ch, {})
+            node[self._END] = value
+
+    def prefix(self, text: str) -> Optional[str]:
+        """Return the value of the longest key that ``text`` starts with."""
+        node = self._root
+        end = self._END
+        found = None
+        for ch in text:
+            child = node.get(ch)
+            if child is None:
+                break
+            node = child
+            found = node.get(end, found)
+        return found
+
+    def search(self, text: str) -> Optional[str]:
+        """Return the leftmost known name in ``text``, longest at that position.
+
+        The walk from position 0 is a longest-prefix match, which covers the
+        common versioned-suffix case (``gpt-4o-mini-2024-07-18``) in one pass.
+        """
+        root = self._root
+        end = self._END
+        for start in range(len(text)):
+            node = root
+            found = None
+            for ch in text[start:]:
+                child = node.get(ch)
+                if child is None:
+                    break
+                node = child
+                found = node.get(end, found)
+            if found is not None:
+                return found
+        return None
+
+
+_MODEL_TRIE = _PricingTrie(_SORTED_MODELS)
+
+_SEPARATORS = re.compile(r"[-._]")
+_DIGITS = re.compile(r"\d+")
+
+# Known names keyed by their separator-free form, so "gpt4o" finds "gpt-4o".
+_BY_BARE_NAME = {_SEPARATORS.sub("", model): model for model in PRICING}
+
+
+@functools.lru_cache(maxsize=None)
+def _rapidfuzz() -> Any:
+    """Return the rapidfuzz module, or None when the optional extra is missing.
+
+    Imported on the first unresolved name rather than with this module, so
+    ``import llm_spend`` and the CLI do not pay for it.
+    """
+    try:
+        import rapidfuzz
+        import rapidfuzz.process  # noqa: F401
+    except ImportError:  # pragma: no cover - optional dependency
+        return None
+    return rapidfuzz
+
+
+@functools.lru_cache(maxsize=_CACHE_SIZE)
+def _resolve_model(model: str) -> Optional[str]:
+    """Return the PRICING key that ``model`` matches, or None."""
     if model in PRICING:
-        return PRICING[model]
+        return model
 
-    # Longest known model that is contained within the given name wins.
-    for known_model in _SORTED_MODELS:
-        if known_model in model:
-            return PRICING[known_model]
+    match = _MODEL_TRIE.search(model)
+    if match is not None:
+        return match
 
     # Reverse: given model is contained within a known model name.
     for known_model in _SORTED_MODELS:
         if model in known_model:
-            return PRICING[known_model]
+            return known_model
+
+    # Same name with different separators.
+    match = _BY_BARE_NAME.get(_SEPARATORS.sub("", model))
+    if match is not None:
+        return match
+
+    # Typos, when rapidfuzz is installed; never across version numbers.
+    rapidfuzz = _rapidfuzz()
+    if rapidfuzz is not None:
+        digits = _DIGITS.findall(model)
+        best = rapidfuzz.process.extractOne(
+            model,
+            [known for known in _SORTED_MODELS if _DIGITS.findall(known) == digits],
+            scorer=rapidfuzz.fuzz.ratio,
+            score_cutoff=_FUZZY_SCORE_CUTOFF,
+        )
+        if best is not None:
+            return best[0]  # type: ignore[no-any-return]
+
+    return None
+
 
-    return {}
+# Shared mapping returned by get_model_pricing for every unknown name.
+_EMPTY: Mapping[str, float] = MappingProxyType({})
+
+
+@functools.lru_cache(maxsize=_CACHE_SIZE)
+def get_model_pricing(model: str) -> Mapping[str, float]:
+    """Get pricing for a model, with fuzzy matching for partial names.
+
+    Results are cached per model string and returned as read-only mappings.
+
+    Matching priority (most-specific first):
+    1. Exact match
+    2. Known model name is a substring of the given model string (leftmost, then longest)
+    3. Given model string is a substring of a known model name (longest match first)
+    4. Same name ignoring ``-``, ``.`` and ``_`` separators
+    5. Closest known name with the same version digits, if ``rapidfuzz`` is installed
+    """
+    name = _resolve_model(model)
+    return PRICING[name] if name is not None else _EMPTY
+
+
+# (input, output) price per million tokens in integer nano-dollars, one flat
+# tuple per known model.  Cost arithmetic is done in integers, matching how
+# the store keeps costs, so summing many small calls does not accumulate
+# float error.
+_PRICE_TUPLES: dict[str, tuple[int, int]] = {
+    model: (round(prices["input"] * 1_000_000_000), round(prices["output"] * 1_000_000_000))
+    for model, prices in PRICING.items()
+}
+_NO_PRICES = (0, 0)
+
+
+@functools.lru_cache(maxsize=_CACHE_SIZE)
+def _model_prices(model: str) -> tuple[int, int]:
+    name = _resolve_model(model)
+    return _PRICE_TUPLES[name] if name is not None else _NO_PRICES
 
 
 def calculate_cost(model: str, input_tokens: int, output_tokens: int) -> float:
     """Calculate cost in USD for a given model and token counts."""
-    pricing = get_model_pricing(model)
-    if not pricing:
-        return 0.0
-    input_cost = (input_tokens / 1_000_000) * pricing["input"]
-    output_cost = (output_tokens / 1_000_000) * pricing["output"]
-    return input_cost + output_cost
+    input_nano, output_nano = _model_prices(model)
+    return (input_tokens * input_nano + output_tokens * output_nano) // 1_000_000 / 1e9
+
+
+def _import_numpy() -> Any:
+    try:
+        import numpy
+    except ImportError as exc:  # pragma: no cover - depends on the environment
+        raise ImportError(
+            "Vectorized cost analysis requires numpy: pip install 'llm-spend[numpy]'"
+        ) from exc
+    return numpy
+
+
+def calculate_costs(
+    models: Sequence[str],
+    model_id: Any,
+    input_tokens: Any,
+    output_tokens: Any,
+) -> Any:
+    """Vectorized ``calculate_cost`` over NumPy arrays (requires numpy).
+
+    ``model_id`` indexes into ``models``; the arrays are typically the ones
+    returned by ``SpendStore.get_all_calls_arrays``.  Useful for re-costing a
+    whole log after a pricing change.
+    """
+    np = _import_numpy()
+    # Nano-dollars per million tokens -> dollars per token.
+    rates = np.array([_model_prices(m) for m in models], dtype=np.float64).reshape(-1, 2) * 1e-15
+    return input_tokens * rates[model_id, 0] + output_tokens * rates[model_id, 1]
+
+
+_PROVIDER_PREFIXES = {
+    "claude": "anthropic",
+    "gpt-": "openai",
+    "o1": "openai",
+    "o3": "openai",
+    "gemini": "google",
+}
+_PROVIDER_TRIE = _PricingTrie(_PROVIDER_PREFIXES)
+
+
+def _provider_from_prefix(model: str) -> str:
+    return _PROVIDER_TRIE.prefix(model.lower()) or "unknown"
+
+
+_PROVIDER_BY_MODEL: dict[str, str] = {model: _provider_from_prefix(model) for model in PRICING}
 
 
+@functools.lru_cache(maxsize=_CACHE_SIZE)
 def detect_provider(model: str) -> str:
     """Detect provider from model name."""
-    model_lower = model.lower()
-    if model_lower.startswith("claude"):
-        return "anthropic"
-    if model_lower.startswith(("gpt-", "o1", "o3")):
-        return "openai"
-    if model_lower.startswith("gemini"):
-        return "google"
-    return "unknown"
+    provider = _PROVIDER_BY_MODEL.get(model)
+    if provider is not None:
+        return provider
+    return _provider_from_prefix(model)
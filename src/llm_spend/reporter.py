@@ -4,105 +4,181 @@ Rich-powered report formatting for llm-spend.
 
 from __future__ import annotations
 
-from typing import Any
+import sqlite3
+from typing import IO, TYPE_CHECKING, Any, Callable, Collection, Mapping, Optional, Sequence, Union
 
-from rich.console import Console
-from rich.panel import Panel
-from rich.table import Table
+if TYPE_CHECKING:
+    from rich.console import Console
+    from rich.table import Table
 
-console = Console()
+# One console for the whole process, created by ``get_console`` on first use
+# so that importing this module does not import Rich.  Markup stays on because
+# the CLI prints styled status lines.
+console: Optional[Console] = None
+
+
+def get_console() -> Console:
+    """Return the shared Rich console, creating it on first use."""
+    global console
+    if console is None:
+        from rich.console import Console
+
+        console = Console(highlight=False)
+    return console
 
 
 def _cost_str(cost: float) -> str:
     return f"${cost:.4f}"
 
 
-def report_by_file(data: list[dict[str, Any]]) -> None:
-    """Print a Rich table: File | Calls | Input Tokens | Output Tokens | Cost."""
-    table = Table(title="Cost by File", show_lines=False, header_style="bold cyan")
-    table.add_column("File", style="white", no_wrap=False)
-    table.add_column("Calls", justify="right", style="yellow")
-    table.add_column("Input Tokens", justify="right", style="blue")
-    table.add_column("Output Tokens", justify="right", style="blue")
-    table.add_column("Cost (USD)", justify="right", style="green")
-
-    for row in data:
-        table.add_row(
-            str(row.get("file", "(unknown)")),
-            str(row.get("calls", 0)),
-            f"{row.get('input_tokens', 0):,}",
-            f"{row.get('output_tokens', 0):,}",
-            _cost_str(row.get("cost_usd", 0.0)),
+# A column is (header, Table.add_column kwargs, cell formatter).  Rows are
+# sqlite3.Row objects from SpendStore (or dicts with the same keys); the SQL
+# already replaces NULL dimensions with placeholders like "(unknown)".
+_Row = Union[sqlite3.Row, Mapping[str, Any]]
+_Column = tuple[str, dict[str, Any], Callable[[_Row], str]]
+
+
+def _text(key: str) -> Callable[[_Row], str]:
+    return lambda row: str(row[key])
+
+
+def _tokens(key: str) -> Callable[[_Row], str]:
+    return lambda row: f"{row[key]:,}"
+
+
+_CALLS: _Column = (
+    "Calls",
+    {"justify": "right", "style": "yellow"},
+    _text("calls"),
+)
+_USAGE: tuple[_Column, ...] = (
+    _CALLS,
+    ("Input Tokens", {"justify": "right", "style": "blue"}, _tokens("input_tokens")),
+    ("Output Tokens", {"justify": "right", "style": "blue"}, _tokens("output_tokens")),
+    (
+        "Cost (USD)",
+        {"justify": "right", "style": "green"},
+        lambda row: _cost_str(row["cost_usd"]),
+    ),
+)
+
+# Table title and columns for each report, built once at import.
+_SCHEMAS: dict[str, tuple[str, tuple[_Column, ...]]] = {
+    "file": (
+        "Cost by File",
+        (("File", {"style": "white", "no_wrap": False}, _text("file")),) + _USAGE,
+    ),
+    "function": (
+        "Cost by Function",
+        (
+            ("Function", {"style": "white"}, _text("function")),
+            ("File", {"style": "dim white", "no_wrap": False}, _text("file")),
         )
+        + _USAGE,
+    ),
+    "model": (
+        "Cost by Model",
+        (
+            ("Model", {"style": "white"}, _text("model")),
+            ("Provider", {"style": "magenta"}, _text("provider")),
+        )
+        + _USAGE,
+    ),
+    "label": (
+        "Cost by Label",
+        (("Label", {"style": "white"}, _text("label")),) + _USAGE,
+    ),
+}
 
-    console.print(table)
 
+# Cell formatters per report, in column order.
+_FORMATTERS: dict[str, tuple[Callable[[_Row], str], ...]] = {
+    kind: tuple(fmt for _, _, fmt in columns) for kind, (_, columns) in _SCHEMAS.items()
+}
 
-def report_by_function(data: list[dict[str, Any]]) -> None:
-    """Print a Rich table: Function | File | Calls | Input Tokens | Output Tokens | Cost."""
-    table = Table(title="Cost by Function", show_lines=False, header_style="bold cyan")
-    table.add_column("Function", style="white")
-    table.add_column("File", style="dim white", no_wrap=False)
-    table.add_column("Calls", justify="right", style="yellow")
-    table.add_column("Input Tokens", justify="right", style="blue")
-    table.add_column("Output Tokens", justify="right", style="blue")
-    table.add_column("Cost (USD)", justify="right", style="green")
-
-    for row in data:
-        table.add_row(
-            str(row.get("function", "(unknown)")),
-            str(row.get("file", "(unknown)")),
-            str(row.get("calls", 0)),
-            f"{row.get('input_tokens', 0):,}",
-            f"{row.get('output_tokens', 0):,}",
-            _cost_str(row.get("cost_usd", 0.0)),
-        )
 
-    console.print(table)
+# Indexes of the right-justified (numeric) columns per report.
+_RIGHT_ALIGNED: dict[str, frozenset[int]] = {
+    kind: frozenset(
+        i for i, (_, options, _) in enumerate(columns) if options.get("justify") == "right"
+    )
+    for kind, (_, columns) in _SCHEMAS.items()
+}
+
 
+def _format_rows(kind: str, data: Sequence[_Row]) -> list[tuple[str, ...]]:
+    """Format every cell of a report up front, in a single pass over ``data``."""
+    formatters = _FORMATTERS[kind]
+    return [tuple(fmt(row) for fmt in formatters) for row in data]
 
-def report_by_model(data: list[dict[str, Any]]) -> None:
-    """Print a Rich table: Model | Provider | Calls | Input Tokens | Output Tokens | Cost."""
-    table = Table(title="Cost by Model", show_lines=False, header_style="bold cyan")
-    table.add_column("Model", style="white")
-    table.add_column("Provider", style="magenta")
-    table.add_column("Calls", justify="right", style="yellow")
-    table.add_column("Input Tokens", justify="right", style="blue")
-    table.add_column("Output Tokens", justify="right", style="blue")
-    table.add_column("Cost (USD)", justify="right", style="green")
-
-    for row in data:
-        table.add_row(
-            str(row.get("model", "(unknown)")),
-            str(row.get("provider", "(unknown)")),
-            str(row.get("calls", 0)),
-            f"{row.get('input_tokens', 0):,}",
-            f"{row.get('output_tokens', 0):,}",
-            _cost_str(row.get("cost_usd", 0.0)),
-        )
 
-    console.print(table)
+def _make_table(title: str, columns: tuple[_Column, ...]) -> Table:
+    from rich.table import Table
 
+    table = Table(title=title, show_lines=False, header_style="bold cyan")
+    for header, options, _ in columns:
+        table.add_column(header, **options)
+    return table
 
-def report_by_label(data: list[dict[str, Any]]) -> None:
-    """Print a Rich table: Label | Calls | Input Tokens | Output Tokens | Cost."""
-    table = Table(title="Cost by Label", show_lines=False, header_style="bold cyan")
-    table.add_column("Label", style="white")
-    table.add_column("Calls", justify="right", style="yellow")
-    table.add_column("Input Tokens", justify="right", style="blue")
-    table.add_column("Output Tokens", justify="right", style="blue")
-    table.add_column("Cost (USD)", justify="right", style="green")
-
-    for row in data:
-        table.add_row(
-            str(row.get("label", "(unlabeled)")),
-            str(row.get("calls", 0)),
-            f"{row.get('input_tokens', 0):,}",
-            f"{row.get('output_tokens', 0):,}",
-            _cost_str(row.get("cost_usd", 0.0)),
-        )
 
-    console.print(table)
+def _render_plain(
+    title: str,
+    headers: Sequence[str],
+    rows: Sequence[Sequence[str]],
+    file: IO[str],
+    right: Collection[int] = (),
+) -> None:
+    """Write a report as fixed-width text, bypassing Rich's layout pass.
+
+    Column widths come from one ``zip`` over the already formatted cells;
+    columns whose index is in ``right`` are right-justified.
+    """
+    widths = [max(map(len, column)) for column in zip(headers, *rows)]
+    justify = [str.rjust if i in right else str.ljust for i in range(len(headers))]
+
+    def line(cells: Sequence[str]) -> str:
+        return "  ".join(j(cell, w) for j, cell, w in zip(justify, cells, widths)).rstrip()
+
+    lines = [title, line(headers)]
+    lines.extend(map(line, rows))
+    file.write("\n".join(lines) + "\n")
+
+
+def _print_report(kind: str, data: Sequence[_Row]) -> None:
+    title, columns = _SCHEMAS[kind]
+    rows = _format_rows(kind, data)
+    out = get_console()
+    # Piped or redirected output gets plain text: no box drawing to strip and
+    # no column measurement for large reports.  Jupyter renders Rich itself.
+    if not (out.is_terminal or out.is_jupyter):
+        headers = [header for header, _, _ in columns]
+        right = _RIGHT_ALIGNED[kind]
+        _render_plain(title, headers, rows, out.file, right)
+        return
+    table = _make_table(title, columns)
+    for cells in rows:
+        table.add_row(*cells)
+    out.print(table)
+
+
+def report_by_file(data: Sequence[_Row]) -> None:
+    """Print a Rich table: File | Calls | Input Tokens | Output Tokens | Cost."""
+    _print_report("file", data)
+
+
+def report_by_function(data: Sequence[_Row]) -> None:
+    """Print a Rich table: Function | File | Calls | Input Tokens | Output Tokens | Cost."""
+    _print_report("function", data)
+
+
+def report_by_model(data: Sequence[_Row]) -> None:
+    """Print a Rich table: Model | Provider | Calls | Input Tokens | Output Tokens | Cost."""
+    _print_report("model", data)
+
+
+def report_by_label(data: Sequence[_Row]) -> None:
+    """Print a Rich table: Label | Calls | Input Tokens | Output Tokens | Cost."""
+    _print_report("label", data)
 
 
 def report_summary(
@@ -112,6 +188,8 @@ def report_summary(
     days: int = 30,
 ) -> None:
     """Print a summary panel."""
+    from rich.panel import Panel
+
     cost = total.get("total_cost", 0.0)
     calls = total.get("total_calls", 0)
     inp = total.get("total_input", 0)
@@ -133,29 +211,33 @@ def report_summary(
         border_style="green",
         expand=False,
     )
-    console.print(panel)
+    get_console().print(panel)
+
 
+_MODELS_TITLE = "Supported Models & Pricing (per 1M tokens)"
+_MODELS_HEADERS = ("Model", "Provider", "Input $/1M", "Output $/1M")
 
-def list_models(pricing: dict[str, dict[str, float]]) -> None:
+
+def list_models(pricing: Mapping[str, Mapping[str, float]]) -> None:
     """Print a Rich table of all known models and their pricing."""
     from llm_spend.pricing import detect_provider
 
-    table = Table(
-        title="Supported Models & Pricing (per 1M tokens)",
-        show_lines=False,
-        header_style="bold cyan",
-    )
-    table.add_column("Model", style="white")
-    table.add_column("Provider", style="magenta")
-    table.add_column("Input $/1M", justify="right", style="blue")
-    table.add_column("Output $/1M", justify="right", style="green")
-
-    for model, prices in sorted(pricing.items()):
-        table.add_row(
-            model,
-            detect_provider(model),
-            f"${prices['input']:.4f}",
-            f"${prices['output']:.4f}",
-        )
-
-    console.print(table)
+    rows = [
+        (model, detect_provider(model), f"${prices['input']:.4f}", f"${prices['output']:.4f}")
+        for model, prices in sorted(pricing.items())
+    ]
+    out = get_console()
+    if not (out.is_terminal or out.is_jupyter):
+        _render_plain(_MODELS_TITLE, _MODELS_HEADERS, rows, out.file, right=(2, 3))
+        return
+
+    from rich.table import Table
+
+    table = Table(title=_MODELS_TITLE, show_lines=False, header_style="bold cyan")
+    table.add_column(_MODELS_HEADERS[0], style="white")
+    table.add_column(_MODELS_HEADERS[1], style="magenta")
+    table.add_column(_MODELS_HEADERS[2], justify="right", style="blue")
+    table.add_column(_MODELS_HEADERS[3], justify="right", style="green")
+    for cells in rows:
+        table.add_row(*cells)
+    out.print(table)
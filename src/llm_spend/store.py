@@ -4,20 +4,53 @@ SQLite storage for LLM spend call logs.
 
 from __future__ import annotations
 
+import atexit
 import csv
+import itertools
 import json
+import os
+import queue
 import sqlite3
-from datetime import datetime, timedelta, timezone
+import threading
+import time
+import weakref
+from collections import defaultdict
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Iterator, Optional
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None  # type: ignore[assignment]
 
 DEFAULT_DB_DIR = Path.home() / ".llm-spend"
 DEFAULT_DB_PATH = DEFAULT_DB_DIR / "spend.db"
 
+
+def _json_bytes(obj: Any) -> bytes:
+    """Serialize to compact UTF-8 JSON, using orjson when it is installed.
+
+    orjson rejects a few things the stdlib accepts (integers wider than 64
+    bits, for one); those fall back to :func:`json.dumps`.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+# ``timestamp`` is UTC microseconds since the Unix epoch and ``cost_nano`` is
+# the cost in integer nano-dollars, so sums are exact; queries expose it as a
+# float ``cost_usd``.  The log is append-only and always range-scanned by time,
+# so it is a WITHOUT ROWID table clustered on (timestamp, id): a ``days=``
+# window is one contiguous run of pages.  ``id`` is assigned by the store.
 _CREATE_TABLE = """
-CREATE TABLE IF NOT EXISTS calls (
-    id             INTEGER PRIMARY KEY AUTOINCREMENT,
-    timestamp      TEXT    NOT NULL,
+CREATE TABLE IF NOT EXISTS {table} (
+    id             INTEGER NOT NULL,
+    timestamp      INTEGER NOT NULL,
     provider       TEXT    NOT NULL,
     model          TEXT    NOT NULL,
     label          TEXT,
@@ -25,30 +58,474 @@ CREATE TABLE IF NOT EXISTS calls (
     function       TEXT,
     input_tokens   INTEGER NOT NULL DEFAULT 0,
     output_tokens  INTEGER NOT NULL DEFAULT 0,
-    cost_usd       REAL    NOT NULL DEFAULT 0.0,
+    cost_nano      INTEGER NOT NULL DEFAULT 0,
     duration_ms    REAL    NOT NULL DEFAULT 0.0,
-    metadata_json  TEXT
+    metadata_json  TEXT,
+    PRIMARY KEY (timestamp, id)
+) WITHOUT ROWID
+"""
+
+# Every report filters on timestamp and then groups by one dimension; these
+# covering indexes let SQLite range-scan the window without touching the table.
+# idx_calls_id keeps ids unique and makes finding the next one a single seek.
+_CREATE_INDEXES = (
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_calls_id ON calls(id)",
+    "CREATE INDEX IF NOT EXISTS idx_calls_ts_file"
+    " ON calls(timestamp, file, cost_nano, input_tokens, output_tokens)",
+    "CREATE INDEX IF NOT EXISTS idx_calls_ts_function"
+    " ON calls(timestamp, function, file, cost_nano, input_tokens, output_tokens)",
+    "CREATE INDEX IF NOT EXISTS idx_calls_ts_label"
+    " ON calls(timestamp, label, cost_nano, input_tokens, output_tokens)",
+    "CREATE INDEX IF NOT EXISTS idx_calls_ts_model"
+    " ON calls(timestamp, model, provider, cost_nano, input_tokens, output_tokens)",
 )
+
+# Older databases are rowid tables, and may hold ISO-8601 text timestamps
+# and/or a REAL ``cost_usd`` column; they are rebuilt with these conversions
+# on open.
+_TEXT_TIMESTAMP_TO_MICROS = """
+COALESCE(CAST(strftime('%s', timestamp) AS INTEGER), 0) * 1000000
++ CASE WHEN substr(timestamp, 20, 1) = '.'
+       THEN CAST(substr(timestamp, 21, 6) AS INTEGER) ELSE 0 END
+"""
+_COST_USD_TO_NANO = "CAST(ROUND(cost_usd * 1000000000) AS INTEGER)"
+
+
+def _migration(timestamp_expr: str, cost_expr: str) -> tuple[str, ...]:
+    return (
+        _CREATE_TABLE.format(table="calls_new"),
+        f"""
+        INSERT INTO calls_new
+        SELECT id, {timestamp_expr}, provider, model, label, file, function,
+               input_tokens, output_tokens, {cost_expr}, duration_ms, metadata_json
+        FROM calls
+        """,
+        "DROP TABLE calls",
+        "ALTER TABLE calls_new RENAME TO calls",
+    )
+
+
+def _pending_migration(conn: sqlite3.Connection) -> tuple[str, ...]:
+    """Return the statements that bring ``calls`` up to date, if any."""
+    columns = {row[1]: row[2] for row in conn.execute("PRAGMA table_info(calls)")}
+    text_timestamps = columns["timestamp"] == "TEXT"
+    real_costs = "cost_usd" in columns
+    (table_sql,) = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'calls'"
+    ).fetchone()
+    rowid_table = "WITHOUT ROWID" not in table_sql.upper()
+    if not (text_timestamps or real_costs or rowid_table):
+        return ()
+    return _migration(
+        _TEXT_TIMESTAMP_TO_MICROS if text_timestamps else "timestamp",
+        _COST_USD_TO_NANO if real_costs else "cost_nano",
+    )
+
+
+# Report queries.  Every method reuses the same SQL text, which keeps it in the
+# connection's prepared-statement cache.
+_SELECT_TOTAL = """
+SELECT
+    COALESCE(SUM(cost_nano), 0) / 1e9 AS total_cost,
+    COALESCE(SUM(input_tokens), 0)    AS total_input,
+    COALESCE(SUM(output_tokens), 0)   AS total_output,
+    COUNT(*)                          AS total_calls
+FROM calls WHERE timestamp >= ?
+"""
+
+# One statement, but no CTE: a CTE referenced several times is materialized
+# into a temp table.  The totals are one aggregate pass, and each top-1
+# subquery reads calls directly so it is served by its covering index.
+_SELECT_SUMMARY = """
+SELECT
+    COALESCE(SUM(cost_nano), 0) / 1e9 AS total_cost,
+    COALESCE(SUM(input_tokens), 0)    AS total_input,
+    COALESCE(SUM(output_tokens), 0)   AS total_output,
+    COUNT(*)                          AS total_calls,
+    (SELECT COALESCE(file, '(unknown)') FROM calls WHERE timestamp >= ?1
+     GROUP BY file ORDER BY SUM(cost_nano) DESC LIMIT 1)  AS top_file,
+    (SELECT model FROM calls WHERE timestamp >= ?1
+     GROUP BY model ORDER BY SUM(cost_nano) DESC LIMIT 1) AS top_model
+FROM calls WHERE timestamp >= ?1
+"""
+
+_SELECT_BY_FILE = """
+SELECT
+    COALESCE(file, '(unknown)') AS file,
+    COUNT(*)                    AS calls,
+    SUM(input_tokens)           AS input_tokens,
+    SUM(output_tokens)          AS output_tokens,
+    SUM(cost_nano) / 1e9        AS cost_usd
+FROM calls
+WHERE timestamp >= ?
+GROUP BY file
+ORDER BY cost_usd DESC
+"""
+
+_SELECT_BY_FUNCTION = """
+SELECT
+    COALESCE(function, '(unknown)')  AS function,
+    COALESCE(file, '(unknown)')      AS file,
+    COUNT(*)                          AS calls,
+    SUM(input_tokens)                 AS input_tokens,
+    SUM(output_tokens)                AS output_tokens,
+    SUM(cost_nano) / 1e9              AS cost_usd
+FROM calls
+WHERE timestamp >= ?
+GROUP BY function, file
+ORDER BY cost_usd DESC
+"""
+
+_SELECT_BY_LABEL = """
+SELECT
+    COALESCE(label, '(unlabeled)') AS label,
+    COUNT(*)                        AS calls,
+    SUM(input_tokens)               AS input_tokens,
+    SUM(output_tokens)              AS output_tokens,
+    SUM(cost_nano) / 1e9            AS cost_usd
+FROM calls
+WHERE timestamp >= ?
+GROUP BY label
+ORDER BY cost_usd DESC
+"""
+
+# Provider is resolved once in the tracker and stored with each call; reports
+# only project it, served from idx_calls_ts_model.
+_SELECT_BY_MODEL = """
+SELECT
+    model,
+    provider,
+    COUNT(*)             AS calls,
+    SUM(input_tokens)    AS input_tokens,
+    SUM(output_tokens)   AS output_tokens,
+    SUM(cost_nano) / 1e9 AS cost_usd
+FROM calls
+WHERE timestamp >= ?
+GROUP BY model, provider
+ORDER BY cost_usd DESC
+"""
+
+# Exports render timestamps as ISO-8601 for readability.  The filter and sort
+# name calls.timestamp explicitly: a bare ORDER BY timestamp would bind to the
+# text alias and sort every row in a temp B-tree before the first is streamed.
+_SELECT_EXPORT = """
+SELECT
+    id,
+    strftime('%Y-%m-%dT%H:%M:%S', timestamp / 1000000, 'unixepoch')
+        || printf('.%06dZ', timestamp % 1000000) AS timestamp,
+    provider, model, label, file, function,
+    input_tokens, output_tokens, cost_nano / 1e9 AS cost_usd, duration_ms, metadata_json
+FROM calls
+WHERE calls.timestamp >= ?
+ORDER BY calls.timestamp DESC
+"""
+
+# ``cost_nano`` rides along with ``cost_usd`` so in-memory aggregation
+# (Snapshot) can sum exact integers like the SQL reports do.
+_SELECT_WINDOW = """
+SELECT
+    id, timestamp, provider, model, label, file, function,
+    input_tokens, output_tokens, cost_nano / 1e9 AS cost_usd, cost_nano,
+    duration_ms, metadata_json
+FROM calls
+WHERE timestamp >= ?
+ORDER BY timestamp DESC
 """
 
+_SELECT_WINDOW_ARRAYS = """
+SELECT model, input_tokens, output_tokens, cost_nano / 1e9 AS cost_usd
+FROM calls WHERE timestamp >= ?
+"""
+
+# Size of each connection's prepared-statement cache (sqlite3 defaults to 128).
+_CACHED_STATEMENTS = 256
+
+_MICROS_PER_DAY = 86_400 * 1_000_000
+
+# Rows fetched per step when streaming an export.
+_EXPORT_CHUNK = 1024
+
+_SELECT_NEXT_ID = "SELECT COALESCE(MAX(id), 0) + 1 FROM calls"
+
+_INSERT_CALL = """
+INSERT INTO calls
+    (id, timestamp, provider, model, label, file, function,
+     input_tokens, output_tokens, cost_nano, duration_ms, metadata_json)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+@contextmanager
+def _write_transaction(conn: sqlite3.Connection) -> Iterator[None]:
+    """Run a block as one write transaction on an autocommit connection.
+
+    BEGIN IMMEDIATE takes the write lock up front instead of upgrading from a
+    read lock mid-transaction, which can fail with SQLITE_BUSY.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+_STOP = object()
+
+# Placeholder shown for NULL dimensions, matching the COALESCEs in the SQL reports.
+_NULL_LABELS = {"label": "(unlabeled)"}
+
+
+class Snapshot:
+    """Call rows fetched once, aggregated in memory as many ways as needed.
+
+    Useful when several breakdowns of the same window are wanted and the
+    window is small enough to hold in memory.
+    """
+
+    def __init__(self, rows: list[sqlite3.Row]) -> None:
+        self.rows = rows
+
+    def total(self) -> dict[str, Any]:
+        """Same shape as ``SpendStore.get_total``."""
+        total_input = total_output = total_nano = 0
+        for r in self.rows:
+            total_input += r["input_tokens"]
+            total_output += r["output_tokens"]
+            total_nano += r["cost_nano"]
+        return {
+            "total_cost": total_nano / 1e9,
+            "total_input": total_input,
+            "total_output": total_output,
+            "total_calls": len(self.rows),
+        }
+
+    def by(self, *keys: str) -> list[dict[str, Any]]:
+        """Group by one or more columns, shaped like ``SpendStore.get_by_*``."""
+        acc: defaultdict[tuple[Any, ...], list[Any]] = defaultdict(lambda: [0, 0, 0, 0])
+        for r in self.rows:
+            a = acc[tuple(r[k] for k in keys)]
+            a[0] += 1
+            a[1] += r["input_tokens"]
+            a[2] += r["output_tokens"]
+            a[3] += r["cost_nano"]
+        result = []
+        for group, (calls, input_tokens, output_tokens, cost_nano) in acc.items():
+            row = {
+                k: _NULL_LABELS.get(k, "(unknown)") if v is None else v for k, v in zip(keys, group)
+            }
+            row.update(
+                calls=calls,
+                input_tokens=input_tokens,
+                output_tokens=output_tokens,
+                cost_usd=cost_nano / 1e9,
+            )
+            result.append(row)
+        result.sort(key=lambda row: row["cost_usd"], reverse=True)
+        return result
+
+
+class _WriterThread(threading.Thread):
+    """Daemon thread that drains queued call rows into the store in batches."""
+
+    def __init__(self, store: SpendStore, max_batch: int = 256) -> None:
+        super().__init__(name="llm-spend-writer", daemon=True)
+        self.queue: queue.Queue[Any] = queue.Queue()
+        self.error: Optional[BaseException] = None
+        self._store = store
+        self._max_batch = max_batch
+
+    def run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self.queue.get()
+            batch: list[tuple[Any, ...]] = []
+            taken = 1
+            while True:
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+                if len(batch) >= self._max_batch:
+                    break
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                taken += 1
+            try:
+                self._store.log_calls_batch(batch)
+            except Exception as exc:  # surfaced to the caller by SpendStore.flush()
+                self.error = exc
+            finally:
+                for _ in range(taken):
+                    self.queue.task_done()
+        self._store._close_connection()
+
+    def stop(self) -> None:
+        """Write everything queued so far, then end the thread."""
+        self.queue.put(_STOP)
+        self.join()
+
+
+# Live stores, so that a forked child can give each one fresh connections
+# and its own writer thread (see SpendStore._after_fork).
+_STORES: weakref.WeakSet[SpendStore] = weakref.WeakSet()
+
+# Connections inherited across a fork.  SQLite handles must not be used (or
+# closed) in the child, so they are only kept referenced, never touched.
+_INHERITED_CONNECTIONS: list[sqlite3.Connection] = []
+
+
+def _after_fork_in_child() -> None:
+    for store in list(_STORES):
+        store._after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
 
 class SpendStore:
-    """Manages persistent storage of LLM API call logs in SQLite."""
+    """Manages persistent storage of LLM API call logs in SQLite.
 
-    def __init__(self, db_path: Optional[Path] = None) -> None:
+    With the default ``batch_size=1`` every ``log_call`` is written immediately.
+    A larger ``batch_size`` buffers records in memory and writes them in a single
+    transaction once ``batch_size`` records are pending or ``flush_interval``
+    seconds have passed since the last write.  With ``background=True`` records
+    are instead handed to a daemon writer thread, so ``log_call`` never waits on
+    SQLite.  Pending records are written before every read, on ``flush()``, and
+    at interpreter exit.
+
+    ``readonly=True`` opens query-only, memory-mapped connections for commands
+    that only report on the log.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[Path] = None,
+        batch_size: int = 1,
+        flush_interval: float = 5.0,
+        background: bool = False,
+        readonly: bool = False,
+    ) -> None:
         self.db_path = Path(db_path) if db_path else DEFAULT_DB_PATH
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        self._init_db()
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self._pending: list[tuple[Any, ...]] = []
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._provisional_ids = itertools.count(1)
+        self._local = threading.local()
+        self.readonly = readonly
+        if readonly:
+            # Create or migrate the schema once, then read through ro connections.
+            conn = self._open_connection(readonly=False)
+            self._init_db(conn)
+            conn.close()
+        else:
+            self._init_db(self.conn)
+        self._writer: Optional[_WriterThread] = None
+        if background:
+            self._start_writer()
+        if background or self.batch_size > 1:
+            atexit.register(self._shutdown)
+        _STORES.add(self)
 
-    def _connect(self) -> sqlite3.Connection:
-        conn = sqlite3.connect(str(self.db_path))
+    def _start_writer(self) -> None:
+        self._writer = _WriterThread(self)
+        self._writer.start()
+
+    def _shutdown(self) -> None:
+        """Write everything still buffered and stop the writer thread."""
+        try:
+            self.flush()
+        finally:
+            writer, self._writer = self._writer, None
+            if writer is not None:
+                writer.stop()
+
+    def _after_fork(self) -> None:
+        """Reset per-process state in a forked child.
+
+        The parent's connection and writer thread do not carry over: rows queued
+        in the child would never be drained, and flush() would block forever.
+        Rows the parent had buffered are the parent's to write.
+        """
+        self._lock = threading.Lock()
+        self._pending = []
+        inherited = getattr(self._local, "conn", None)
+        if inherited is not None:
+            _INHERITED_CONNECTIONS.append(inherited)
+        self._local = threading.local()
+        if self._writer is not None:
+            self._start_writer()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """This thread's connection, opened on first use and kept for reuse.
+
+        Reusing one connection keeps sqlite3's prepared-statement cache warm.
+        The connection is in autocommit mode; writes open explicit transactions.
+        """
+        conn: Optional[sqlite3.Connection] = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._open_connection(self.readonly)
+            self._local.conn = conn
+        return conn
+
+    def _open_connection(self, readonly: bool) -> sqlite3.Connection:
+        if readonly:
+            uri = f"{self.db_path.resolve().as_uri()}?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False, isolation_level=None)
+            # Let SQLite read pages straight from the OS page cache.
+            conn.execute("PRAGMA mmap_size=268435456")
+            conn.execute("PRAGMA query_only=1")
+        else:
+            conn = sqlite3.connect(
+                str(self.db_path),
+                check_same_thread=False,
+                isolation_level=None,
+                cached_statements=_CACHED_STATEMENTS,
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
         conn.row_factory = sqlite3.Row
+        conn.set_trace_callback(None)
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-20000")
         return conn
 
-    def _init_db(self) -> None:
-        with self._connect() as conn:
-            conn.execute(_CREATE_TABLE)
-            conn.commit()
+    def close(self) -> None:
+        """Flush pending records, stop the writer and close this thread's connection."""
+        self._shutdown()
+        atexit.unregister(self._shutdown)
+        self._close_connection()
+
+    def _close_connection(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _init_db(self, conn: sqlite3.Connection) -> None:
+        conn.execute(_CREATE_TABLE.format(table="calls"))
+        if _pending_migration(conn):
+            with _write_transaction(conn):
+                # Decide again under the write lock: another process may have
+                # migrated the table since the check above, and converting
+                # already-converted timestamps would zero them.
+                for statement in _pending_migration(conn):
+                    conn.execute(statement)
+        has_indexes = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_calls_id'"
+        ).fetchone()
+        if not has_indexes:
+            for statement in _CREATE_INDEXES:
+                conn.execute(statement)
+            conn.execute("ANALYZE calls")
 
     # ------------------------------------------------------------------
     # Write
@@ -67,153 +544,176 @@ class SpendStore:
         duration_ms: float,
         metadata: Optional[dict[str, Any]] = None,
     ) -> int:
-        """Insert a new call record and return its id."""
-        timestamp = datetime.now(timezone.utc).isoformat()
-        metadata_json = json.dumps(metadata) if metadata else None
-        with self._connect() as conn:
-            cursor = conn.execute(
-                """
-                INSERT INTO calls
-                    (timestamp, provider, model, label, file, function,
-                     input_tokens, output_tokens, cost_usd, duration_ms, metadata_json)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    timestamp,
-                    provider,
-                    model,
-                    label,
-                    file,
-                    function,
-                    input_tokens,
-                    output_tokens,
-                    cost_usd,
-                    duration_ms,
-                    metadata_json,
-                ),
-            )
-            conn.commit()
-            return cursor.lastrowid  # type: ignore[return-value]
+        """Insert a new call record and return its id.
+
+        When the record is buffered rather than written (``batch_size > 1`` or
+        ``background=True``) the row id is not known yet, so a provisional id is
+        returned instead: a per-store sequence number starting at 1, not the
+        database row id.
+        """
+        timestamp = int(time.time() * 1_000_000)
+        metadata_json = _json_bytes(metadata).decode() if metadata else None
+        row = (
+            timestamp,
+            provider,
+            model,
+            label,
+            file,
+            function,
+            input_tokens,
+            output_tokens,
+            int(round(cost_usd * 1_000_000_000)),
+            duration_ms,
+            metadata_json,
+        )
+        if self._writer is not None:
+            self._writer.queue.put(row)
+            return next(self._provisional_ids)
+        if self.batch_size == 1:
+            return self.log_calls_batch([row])
+
+        with self._lock:
+            self._pending.append(row)
+        self._maybe_flush()
+        return next(self._provisional_ids)
+
+    def log_calls_batch(self, rows: list[tuple[Any, ...]]) -> int:
+        """Insert many call records in a single transaction.
+
+        Each row is a tuple in ``calls`` column order, starting at ``timestamp``;
+        the cost is given as integer nano-dollars (``cost_nano``).  Rows get
+        consecutive ids following the current maximum, assigned under the
+        write lock.  Returns the id of the last inserted row.
+        """
+        if not rows:
+            return 0
+        conn = self.conn
+        with _write_transaction(conn):
+            first_id = conn.execute(_SELECT_NEXT_ID).fetchone()[0]
+            if len(rows) == 1:
+                conn.execute(_INSERT_CALL, (first_id, *rows[0]))
+            else:
+                conn.executemany(
+                    _INSERT_CALL, [(call_id, *row) for call_id, row in enumerate(rows, first_id)]
+                )
+        self._last_flush = time.monotonic()
+        return first_id + len(rows) - 1  # type: ignore[no-any-return]
+
+    def _maybe_flush(self) -> None:
+        if (
+            len(self._pending) >= self.batch_size
+            or time.monotonic() - self._last_flush >= self.flush_interval
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        """Write any buffered call records to the database.
+
+        Raises the last error hit by the background writer, if any.
+        """
+        if self._writer is not None:
+            self._writer.queue.join()
+            error, self._writer.error = self._writer.error, None
+            if error is not None:
+                raise error
+        with self._lock:
+            rows, self._pending = self._pending, []
+            if rows:
+                self.log_calls_batch(rows)
 
     # ------------------------------------------------------------------
     # Read helpers
     # ------------------------------------------------------------------
 
-    def _cutoff(self, days: int) -> str:
-        return (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+    def _cutoff(self, days: int) -> int:
+        # Plain integer arithmetic on the wall clock, in the same epoch
+        # microseconds as the timestamp column (a monotonic clock has no epoch).
+        return int(time.time() * 1_000_000) - days * _MICROS_PER_DAY
 
     def get_total(self, days: int = 30) -> dict[str, float]:
         """Return total spend metrics over the last N days."""
+        self.flush()
+        cutoff = self._cutoff(days)
+        row = self.conn.execute(_SELECT_TOTAL, (cutoff,)).fetchone()
+        return dict(row)
+
+    def get_summary(self, days: int = 30) -> dict[str, Any]:
+        """Return ``get_total`` metrics plus the top file and model, in one query.
+
+        ``top_file`` and ``top_model`` are None when there are no calls.
+        """
+        self.flush()
         cutoff = self._cutoff(days)
-        with self._connect() as conn:
-            row = conn.execute(
-                """
-                SELECT
-                    COALESCE(SUM(cost_usd), 0.0)    AS total_cost,
-                    COALESCE(SUM(input_tokens), 0)  AS total_input,
-                    COALESCE(SUM(output_tokens), 0) AS total_output,
-                    COUNT(*)                         AS total_calls
-                FROM calls WHERE timestamp >= ?
-                """,
-                (cutoff,),
-            ).fetchone()
+        row = self.conn.execute(_SELECT_SUMMARY, (cutoff,)).fetchone()
         return dict(row)
 
-    def get_by_file(self, days: int = 30) -> list[dict[str, Any]]:
+    def snapshot(self, days: int = 30) -> Snapshot:
+        """Fetch the window's call rows once for in-memory aggregation."""
+        self.flush()
+        rows = self.conn.execute(_SELECT_WINDOW, (self._cutoff(days),)).fetchall()
+        return Snapshot(rows)
+
+    def get_by_file(self, days: int = 30) -> list[sqlite3.Row]:
         """Aggregate cost per source file."""
+        self.flush()
         cutoff = self._cutoff(days)
-        with self._connect() as conn:
-            rows = conn.execute(
-                """
-                SELECT
-                    COALESCE(file, '(unknown)') AS file,
-                    COUNT(*)                    AS calls,
-                    SUM(input_tokens)           AS input_tokens,
-                    SUM(output_tokens)          AS output_tokens,
-                    SUM(cost_usd)               AS cost_usd
-                FROM calls
-                WHERE timestamp >= ?
-                GROUP BY file
-                ORDER BY cost_usd DESC
-                """,
-                (cutoff,),
-            ).fetchall()
-        return [dict(r) for r in rows]
-
-    def get_by_function(self, days: int = 30) -> list[dict[str, Any]]:
+        return self.conn.execute(_SELECT_BY_FILE, (cutoff,)).fetchall()
+
+    def get_by_function(self, days: int = 30) -> list[sqlite3.Row]:
         """Aggregate cost per function."""
+        self.flush()
         cutoff = self._cutoff(days)
-        with self._connect() as conn:
-            rows = conn.execute(
-                """
-                SELECT
-                    COALESCE(function, '(unknown)')  AS function,
-                    COALESCE(file, '(unknown)')      AS file,
-                    COUNT(*)                          AS calls,
-                    SUM(input_tokens)                 AS input_tokens,
-                    SUM(output_tokens)                AS output_tokens,
-                    SUM(cost_usd)                     AS cost_usd
-                FROM calls
-                WHERE timestamp >= ?
-                GROUP BY function, file
-                ORDER BY cost_usd DESC
-                """,
-                (cutoff,),
-            ).fetchall()
-        return [dict(r) for r in rows]
-
-    def get_by_label(self, days: int = 30) -> list[dict[str, Any]]:
+        return self.conn.execute(_SELECT_BY_FUNCTION, (cutoff,)).fetchall()
+
+    def get_by_label(self, days: int = 30) -> list[sqlite3.Row]:
         """Aggregate cost per label."""
+        self.flush()
         cutoff = self._cutoff(days)
-        with self._connect() as conn:
-            rows = conn.execute(
-                """
-                SELECT
-                    COALESCE(label, '(unlabeled)') AS label,
-                    COUNT(*)                        AS calls,
-                    SUM(input_tokens)               AS input_tokens,
-                    SUM(output_tokens)              AS output_tokens,
-                    SUM(cost_usd)                   AS cost_usd
-                FROM calls
-                WHERE timestamp >= ?
-                GROUP BY label
-                ORDER BY cost_usd DESC
-                """,
-                (cutoff,),
-            ).fetchall()
-        return [dict(r) for r in rows]
-
-    def get_by_model(self, days: int = 30) -> list[dict[str, Any]]:
+        return self.conn.execute(_SELECT_BY_LABEL, (cutoff,)).fetchall()
+
+    def get_by_model(self, days: int = 30) -> list[sqlite3.Row]:
         """Aggregate cost per model."""
+        self.flush()
         cutoff = self._cutoff(days)
-        with self._connect() as conn:
-            rows = conn.execute(
-                """
-                SELECT
-                    model,
-                    provider,
-                    COUNT(*)          AS calls,
-                    SUM(input_tokens) AS input_tokens,
-                    SUM(output_tokens)AS output_tokens,
-                    SUM(cost_usd)     AS cost_usd
-                FROM calls
-                WHERE timestamp >= ?
-                GROUP BY model, provider
-                ORDER BY cost_usd DESC
-                """,
-                (cutoff,),
-            ).fetchall()
-        return [dict(r) for r in rows]
+        return self.conn.execute(_SELECT_BY_MODEL, (cutoff,)).fetchall()
 
     def get_all_calls(self, days: int = 30) -> list[dict[str, Any]]:
-        """Return raw call rows."""
+        """Return raw call rows (``timestamp`` in epoch microseconds)."""
+        return list(self.iter_all_calls(days=days))
+
+    def iter_all_calls(self, days: int = 30) -> Iterator[dict[str, Any]]:
+        """Yield raw call rows one at a time without loading them all into memory."""
+        self.flush()
         cutoff = self._cutoff(days)
-        with self._connect() as conn:
-            rows = conn.execute(
-                "SELECT * FROM calls WHERE timestamp >= ? ORDER BY timestamp DESC",
-                (cutoff,),
-            ).fetchall()
-        return [dict(r) for r in rows]
+        cursor = self.conn.execute(_SELECT_WINDOW, (cutoff,))
+        for row in cursor:
+            yield dict(row)
+
+    def get_all_calls_arrays(self, days: int = 30) -> dict[str, Any]:
+        """Return call columns as NumPy arrays for bulk analysis (requires numpy).
+
+        The result has ``model_id``, ``input_tokens``, ``output_tokens`` and
+        ``cost_usd`` arrays plus ``models``, the list that ``model_id`` indexes.
+        Pass it to ``llm_spend.pricing.calculate_costs`` to re-cost every call.
+        """
+        from llm_spend.pricing import _import_numpy
+
+        np = _import_numpy()
+        self.flush()
+        cursor = self.conn.execute(_SELECT_WINDOW_ARRAYS, (self._cutoff(days),))
+        model_ids: dict[str, int] = {}
+        records = np.fromiter(
+            ((model_ids.setdefault(m, len(model_ids)), i, o, c) for m, i, o, c in cursor),
+            dtype=[
+                ("model_id", "i4"),
+                ("input_tokens", "i8"),
+                ("output_tokens", "i8"),
+                ("cost_usd", "f8"),
+            ],
+        )
+        arrays: dict[str, Any] = {name: records[name] for name in records.dtype.names}
+        arrays["models"] = list(model_ids)
+        return arrays
 
     # ------------------------------------------------------------------
     # Management
@@ -221,29 +721,52 @@ class SpendStore:
 
     def clear(self, days: Optional[int] = None) -> int:
         """Delete records.  If days is given, delete records older than N days."""
-        with self._connect() as conn:
+        self.flush()
+        conn = self.conn
+        with _write_transaction(conn):
             if days is None:
                 cursor = conn.execute("DELETE FROM calls")
             else:
                 cutoff = self._cutoff(days)
                 cursor = conn.execute("DELETE FROM calls WHERE timestamp < ?", (cutoff,))
-            conn.commit()
-            return cursor.rowcount
+        return cursor.rowcount
+
+    def _export_cursor(self) -> sqlite3.Cursor:
+        self.flush()
+        cutoff = self._cutoff(365 * 10)  # effectively all
+        return self.conn.execute(_SELECT_EXPORT, (cutoff,))
 
     def export_csv(self, path: str) -> int:
-        """Export all calls to a CSV file.  Returns number of rows written."""
-        rows = self.get_all_calls(days=365 * 10)  # effectively all
-        if not rows:
-            return 0
+        """Export all calls to a CSV file.  Returns number of rows written.
+
+        Rows are streamed from the cursor in fixed-size chunks, so memory use
+        does not grow with the log.
+        """
+        cursor = self._export_cursor()
+        count = 0
         with open(path, "w", newline="") as f:
-            writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
-            writer.writeheader()
-            writer.writerows(rows)
-        return len(rows)
+            writer = csv.writer(f)
+            writer.writerow([col[0] for col in cursor.description])
+            while True:
+                rows = cursor.fetchmany(_EXPORT_CHUNK)
+                if not rows:
+                    break
+                writer.writerows(rows)
+                count += len(rows)
+        return count
 
     def export_json(self, path: str) -> int:
-        """Export all calls to a JSON file.  Returns number of rows written."""
-        rows = self.get_all_calls(days=365 * 10)
-        with open(path, "w") as f:
-            json.dump(rows, f, indent=2)
-        return len(rows)
+        """Export all calls to a JSON array, one object per line.  Returns rows written.
+
+        Rows are streamed from the cursor, so memory use does not grow with the log.
+        """
+        cursor = self._export_cursor()
+        count = 0
+        with open(path, "wb") as f:
+            f.write(b"[")
+            for row in cursor:
+                f.write(b",\n  " if count else b"\n  ")
+                f.write(_json_bytes(dict(row)))
+                count += 1
+            f.write(b"\n]\n" if count else b"]\n")
+        return count
@@ -5,22 +5,24 @@ Decorator and context manager for tracking LLM API call costs.
 from __future__ import annotations
 
 import functools
-import inspect
+import operator
+import sys
 import time
-from contextlib import contextmanager
-from typing import Any, Iterator, Optional
+from types import CodeType
+from typing import Any, Callable, Optional
 
 from llm_spend.pricing import calculate_cost, detect_provider
 from llm_spend.store import SpendStore
 
-# Module-level default store (lazily created)
+# Module-level default store (lazily created).  It writes on a background
+# thread so tracked calls never wait on a SQLite commit.
 _store: Optional[SpendStore] = None
 
 
 def _get_store() -> SpendStore:
     global _store
     if _store is None:
-        _store = SpendStore()
+        _store = SpendStore(background=True)
     return _store
 
 
@@ -35,51 +37,97 @@ def _set_store(store: SpendStore) -> None:
 # ------------------------------------------------------------------
 
 
+# Field-name pairs for usage objects, most common first: OpenAI style
+# (prompt_tokens / completion_tokens), then Anthropic style
+# (input_tokens / output_tokens).
+_USAGE_FIELDS = (
+    ("prompt_tokens", "completion_tokens"),
+    ("input_tokens", "output_tokens"),
+)
+_ATTR_GETTERS = tuple(operator.attrgetter(*fields) for fields in _USAGE_FIELDS)
+_ITEM_GETTERS = tuple(operator.itemgetter(*fields) for fields in _USAGE_FIELDS)
+
+# Getter that last worked for each usage type, so a steady stream of
+# responses from one SDK dispatches with a single dict lookup.
+_TOKEN_GETTERS: dict[type, Callable[[Any], tuple[Any, Any]]] = {}
+
+
+def _partial_tokens(usage: Any) -> tuple[int, int]:
+    """Fallback for usage objects that carry neither complete field pair."""
+    if isinstance(usage, dict):
+        fields = usage
+    else:
+        names = [name for pair in _USAGE_FIELDS for name in pair]
+        fields = {name: getattr(usage, name, None) for name in names}
+
+    inp = fields.get("input_tokens") or fields.get("prompt_tokens") or 0
+    out = fields.get("output_tokens") or fields.get("completion_tokens") or 0
+    return int(inp), int(out)
+
+
 def _extract_tokens(response: Any) -> tuple[int, int]:
     """Extract (input_tokens, output_tokens) from common response objects."""
     if response is None:
         return 0, 0
+    if isinstance(response, dict):
+        usage = response.get("usage")
+    else:
+        usage = getattr(response, "usage", None)
+    if usage is None:
+        return 0, 0
 
-    usage = getattr(response, "usage", None)
-    if usage is not None:
-        # OpenAI style: prompt_tokens / completion_tokens
-        prompt = getattr(usage, "prompt_tokens", None)
-        completion = getattr(usage, "completion_tokens", None)
-        if prompt is not None and completion is not None:
-            return int(prompt), int(completion)
-
-        # Anthropic style: input_tokens / output_tokens
-        inp = getattr(usage, "input_tokens", None)
-        out = getattr(usage, "output_tokens", None)
+    usage_type = type(usage)
+    getter = _TOKEN_GETTERS.get(usage_type)
+    if getter is not None:
+        try:
+            inp, out = getter(usage)
+        except (AttributeError, KeyError):
+            pass
+        else:
+            if inp is not None and out is not None:
+                return int(inp), int(out)
+
+    # Cache miss, or a type such as SimpleNamespace whose instances vary in
+    # shape: probe each field pair and remember the one that matched.
+    for getter in _ITEM_GETTERS if isinstance(usage, dict) else _ATTR_GETTERS:
+        try:
+            inp, out = getter(usage)
+        except (AttributeError, KeyError):
+            continue
         if inp is not None and out is not None:
+            _TOKEN_GETTERS[usage_type] = getter
             return int(inp), int(out)
 
-        # Generic fallback
-        inp = getattr(usage, "input_tokens", None) or getattr(usage, "prompt_tokens", 0)
-        out = getattr(usage, "output_tokens", None) or getattr(usage, "completion_tokens", 0)
-        return int(inp), int(out)
+    return _partial_tokens(usage)
 
-    # Dict-style usage
-    if isinstance(response, dict):
-        usage_dict = response.get("usage", {})
-        if isinstance(usage_dict, dict):
-            inp = usage_dict.get("input_tokens") or usage_dict.get("prompt_tokens", 0)
-            out = usage_dict.get("output_tokens") or usage_dict.get("completion_tokens", 0)
-            return int(inp), int(out)
 
-    return 0, 0
+_get_model_attr = operator.attrgetter("model")
+_get_model_item = operator.methodcaller("get", "model")
+
+
+def _model_attr(response: Any) -> Any:
+    try:
+        return _get_model_attr(response)
+    except AttributeError:
+        return None
+
+
+# Model getter per response type: dict.get for mappings, attribute access
+# for SDK objects.
+_MODEL_GETTERS: dict[type, Callable[[Any], Any]] = {}
 
 
 def _extract_model(response: Any) -> Optional[str]:
     """Extract model name from a response object."""
     if response is None:
         return None
-    model = getattr(response, "model", None)
-    if model:
-        return str(model)
-    if isinstance(response, dict):
-        return response.get("model")
-    return None
+    response_type = type(response)
+    getter = _MODEL_GETTERS.get(response_type)
+    if getter is None:
+        getter = _get_model_item if issubclass(response_type, dict) else _model_attr
+        _MODEL_GETTERS[response_type] = getter
+    model = getter(response)
+    return str(model) if model else None
 
 
 # ------------------------------------------------------------------
@@ -91,6 +139,7 @@ def track(
     model: str,
     label: Optional[str] = None,
     provider: Optional[str] = None,
+    log_empty: bool = False,
 ):
     """
     Decorator to track LLM API call costs.
@@ -101,21 +150,31 @@ def track(
         def summarize(text):
             response = openai_client.chat.completions.create(...)
             return response
+
+    Calls whose response carries no token usage (e.g. streaming responses) are
+    not recorded unless a ``label`` is given or ``log_empty=True``.
     """
+    # An explicit label marks the call as worth recording even without usage.
+    log_empty = log_empty or label is not None
 
     def decorator(func: Any) -> Any:
         @functools.wraps(func)
         def wrapper(*args: Any, **kwargs: Any) -> Any:
-            # Capture caller info one level above wrapper
-            frame = inspect.stack()[1]
-            caller_file: str = frame.filename
-            caller_function: str = frame.function
-
-            start = time.time()
+            start = time.perf_counter_ns()
             result = func(*args, **kwargs)
-            duration_ms = (time.time() - start) * 1000.0
+            duration_ms = (time.perf_counter_ns() - start) / 1_000_000
 
+            # Nothing to record: return before any provider, cost, caller or
+            # store work (the default store is not even created).
             input_tokens, output_tokens = _extract_tokens(result)
+            if not (input_tokens or output_tokens or log_empty):
+                return result
+
+            # Capture caller info one level above wrapper
+            caller = sys._getframe(1).f_code
+            caller_file: str = caller.co_filename
+            caller_function: str = caller.co_name
+
             detected_model = _extract_model(result) or model
             detected_provider = provider or detect_provider(detected_model)
             cost = calculate_cost(detected_model, input_tokens, output_tokens)
@@ -151,12 +210,62 @@ class SpendContext:
         self.output_tokens: int = 0
 
 
-@contextmanager
+class _Spending:
+    """Context manager returned by ``spending``.
+
+    A plain class rather than a ``@contextmanager`` generator, so entering and
+    leaving the block costs two method calls and no generator frame.
+    """
+
+    __slots__ = ("model", "label", "provider", "log_empty", "caller", "ctx", "start")
+
+    def __init__(
+        self,
+        model: str,
+        label: Optional[str],
+        provider: Optional[str],
+        log_empty: bool,
+        caller: CodeType,
+    ) -> None:
+        self.model = model
+        self.label = label
+        self.provider = provider
+        self.log_empty = log_empty
+        self.caller = caller
+        self.ctx = SpendContext()
+        self.start = 0
+
+    def __enter__(self) -> SpendContext:
+        self.start = time.perf_counter_ns()
+        return self.ctx
+
+    def __exit__(self, *exc_info: Any) -> None:
+        # Runs on both normal exit and exceptions; returning None lets any
+        # exception propagate.
+        duration_ms = (time.perf_counter_ns() - self.start) / 1_000_000
+        ctx = self.ctx
+        if not (ctx.input_tokens or ctx.output_tokens or self.log_empty):
+            return
+        model = self.model
+        _get_store().log_call(
+            provider=self.provider or detect_provider(model),
+            model=model,
+            label=self.label,
+            file=self.caller.co_filename,
+            function=self.caller.co_name,
+            input_tokens=ctx.input_tokens,
+            output_tokens=ctx.output_tokens,
+            cost_usd=calculate_cost(model, ctx.input_tokens, ctx.output_tokens),
+            duration_ms=duration_ms,
+        )
+
+
 def spending(
     model: str,
     label: Optional[str] = None,
     provider: Optional[str] = None,
-) -> Iterator[SpendContext]:
+    log_empty: bool = False,
+) -> _Spending:
     """
     Context manager for manual tracking::
 
@@ -164,30 +273,10 @@ def spending(
             response = client.messages.create(...)
             s.input_tokens = response.usage.input_tokens
             s.output_tokens = response.usage.output_tokens
-    """
-    ctx = SpendContext()
-
-    # Capture caller info
-    frame = inspect.stack()[1]
-    caller_file: str = frame.filename
-    caller_function: str = frame.function
-
-    start = time.time()
-    try:
-        yield ctx
-    finally:
-        duration_ms = (time.time() - start) * 1000.0
-        detected_provider = provider or detect_provider(model)
-        cost = calculate_cost(model, ctx.input_tokens, ctx.output_tokens)
 
-        _get_store().log_call(
-            provider=detected_provider,
-            model=model,
-            label=label,
-            file=caller_file,
-            function=caller_function,
-            input_tokens=ctx.input_tokens,
-            output_tokens=ctx.output_tokens,
-            cost_usd=cost,
-            duration_ms=duration_ms,
-        )
+    Blocks that leave both token counts at zero are not recorded unless a
+    ``label`` is given or ``log_empty=True``.
+    """
+    # Capture caller info from the frame that opens the ``with`` block.
+    caller = sys._getframe(1).f_code
+    return _Spending(model, label, provider, log_empty or label is not None, caller)
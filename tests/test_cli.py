@@ -0,0 +1,120 @@
+"""Tests for llm_spend.cli."""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from llm_spend import cli as cli_module
+from llm_spend import store as store_module
+from llm_spend.cli import main
+from llm_spend.store import SpendStore
+
+# ---------------------------------------------------------------------------
+# Helpers / fixtures
+# ---------------------------------------------------------------------------
+
+
+@pytest.fixture()
+def home(tmp_path: Path, monkeypatch) -> Path:
+    """Point HOME, and the store's default path derived from it, at a temp dir."""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    db_dir = tmp_path / ".llm-spend"
+    monkeypatch.setattr(store_module, "DEFAULT_DB_DIR", db_dir)
+    monkeypatch.setattr(store_module, "DEFAULT_DB_PATH", db_dir / "spend.db")
+    # No store cached from another test's database.
+    cli_module._get_store.cache_clear()
+    yield tmp_path
+    cli_module._get_store.cache_clear()
+
+
+@pytest.fixture()
+def populated(home: Path) -> Path:
+    store = SpendStore()
+    for file, model, cost in [("a.py", "gpt-4o", 0.25), ("b.py", "o1", 0.5), ("b.py", "o1", 0.5)]:
+        store.log_call(
+            provider="openai",
+            model=model,
+            label="feature",
+            file=file,
+            function="run",
+            input_tokens=1000,
+            output_tokens=200,
+            cost_usd=cost,
+            duration_ms=5.0,
+        )
+    store.close()
+    return home
+
+
+def _run(*args: str):
+    result = CliRunner().invoke(main, list(args))
+    assert result.exit_code == 0, result.output
+    return result.output
+
+
+# ---------------------------------------------------------------------------
+# Tests
+# ---------------------------------------------------------------------------
+
+
+class TestStartup:
+    @pytest.mark.parametrize("flag", ["--help", "--version"])
+    def test_does_not_touch_db_or_import_rich(self, tmp_path: Path, flag: str):
+        code = (
+            "import sys\n"
+            "from click.testing import CliRunner\n"
+            "from llm_spend.cli import main\n"
+            f"result = CliRunner().invoke(main, [{flag!r}])\n"
+            "assert result.exit_code == 0, result.output\n"
+            "print('rich' in sys.modules)\n"
+        )
+        env = dict(os.environ, HOME=str(tmp_path))
+        result = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True, env=env
+        )
+        assert result.stdout.strip() == "False"
+        assert not (tmp_path / ".llm-spend" / "spend.db").exists()
+
+
+class TestCommands:
+    def test_report_by_file(self, populated: Path):
+        output = _run("report", "--by", "file")
+        (line,) = [line for line in output.splitlines() if "b.py" in line]
+        assert "2,000" in line
+        assert "$1.0000" in line
+
+    def test_report_by_model_is_default(self, populated: Path):
+        output = _run("report")
+        assert "Cost by Model" in output
+        assert "gpt-4o" in output
+
+    def test_report_empty_store(self, home: Path):
+        assert "No records found" in _run("report")
+
+    def test_summary(self, populated: Path):
+        output = _run("summary")
+        assert "$1.2500" in output
+        assert "b.py" in output
+        assert "o1" in output
+
+    @pytest.mark.parametrize("fmt", ["csv", "json"])
+    def test_export(self, populated: Path, fmt: str):
+        out = populated / f"export.{fmt}"
+        output = _run("export", "--format", fmt, "--output", str(out))
+        assert "Exported 3 record(s)" in output
+        if fmt == "json":
+            assert len(json.loads(out.read_text())) == 3
+        else:
+            assert len(out.read_text().splitlines()) == 4
+
+    def test_clear_yes(self, populated: Path):
+        assert "Deleted 3 record(s)" in _run("clear", "--yes")
+        assert SpendStore().get_total(days=1)["total_calls"] == 0
+
+    def test_models(self, home: Path):
+        assert "gpt-4o" in _run("models")
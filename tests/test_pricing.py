@@ -1,8 +1,17 @@
 """Tests for llm_spend.pricing."""
 
+import subprocess
+import sys
+
 import pytest
 
-from llm_spend.pricing import PRICING, calculate_cost, detect_provider, get_model_pricing
+from llm_spend.pricing import (
+    PRICING,
+    calculate_cost,
+    calculate_costs,
+    detect_provider,
+    get_model_pricing,
+)
 
 
 class TestCalculateCost:
@@ -34,6 +43,27 @@ class TestCalculateCost:
         cost = calculate_cost("totally-unknown-model-xyz", 100_000, 100_000)
         assert cost == 0.0
 
+    @pytest.mark.parametrize("model", sorted(PRICING))
+    def test_matches_published_prices(self, model):
+        prices = PRICING[model]
+        expected = (1234 * prices["input"] + 567 * prices["output"]) / 1_000_000
+        assert calculate_cost(model, 1234, 567) == pytest.approx(expected, abs=1e-9)
+
+
+class TestCalculateCosts:
+    def test_matches_scalar_calculate_cost(self):
+        np = pytest.importorskip("numpy")
+        models = ["gpt-4o", "claude-sonnet-4", "totally-unknown-model-xyz"]
+        model_id = np.array([0, 1, 2, 0])
+        input_tokens = np.array([1_000_000, 500_000, 100, 10])
+        output_tokens = np.array([1_000_000, 250_000, 100, 0])
+        costs = calculate_costs(models, model_id, input_tokens, output_tokens)
+        expected = [
+            calculate_cost(models[m], i, o)
+            for m, i, o in zip(model_id.tolist(), input_tokens.tolist(), output_tokens.tolist())
+        ]
+        assert costs.tolist() == pytest.approx(expected, rel=1e-9)
+
 
 class TestFuzzyModelMatching:
     def test_exact_match(self):
@@ -52,10 +82,61 @@ class TestFuzzyModelMatching:
         pricing = get_model_pricing("claude-3-5-sonnet-20241022-v1")
         assert pricing != {}
 
+    def test_prefixed_name_prefers_longest_known_model(self):
+        pricing = get_model_pricing("openai/gpt-4o-mini-2024-07-18")
+        assert pricing["input"] == pytest.approx(0.15)
+
+    def test_longest_known_prefix_wins(self):
+        # "o1" and "o1-mini" both prefix the name; the longer one must win.
+        assert get_model_pricing("o1-mini-2024-09-12")["input"] == pytest.approx(3.00)
+        assert get_model_pricing("o1-2024-12-17")["input"] == pytest.approx(15.00)
+
+    def test_separator_differences_match(self):
+        assert get_model_pricing("gpt4o-mini")["input"] == pytest.approx(0.15)
+        assert get_model_pricing("gemini-1_5-pro") == PRICING["gemini-1.5-pro"]
+
+    def test_near_miss_matches_with_rapidfuzz(self):
+        pytest.importorskip("rapidfuzz")
+        assert get_model_pricing("gtp-4o-mini") == PRICING["gpt-4o-mini"]
+
+    def test_rapidfuzz_not_imported_with_package(self):
+        code = "import sys, llm_spend; print('rapidfuzz' in sys.modules)"
+        result = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        )
+        assert result.stdout.strip() == "False"
+
+    @pytest.mark.parametrize(
+        "model", ["o3-mini", "o4-mini", "gemini-2.5-flash", "gemini-2.5-pro", "gpt-4.1-mini"]
+    )
+    def test_other_versions_are_not_priced_as_known_models(self, model):
+        # Close spellings, but different models with different prices.
+        assert get_model_pricing(model) == {}
+
     def test_unknown_model_returns_empty(self):
         pricing = get_model_pricing("no-such-model-xyz-9999")
         assert pricing == {}
 
+    def test_misses_share_one_empty_mapping(self):
+        first = get_model_pricing("no-such-model-xyz-9999")
+        assert get_model_pricing("another-unknown-qqq-0000") is first
+        assert get_model_pricing("gpt-4o") is get_model_pricing("gpt-4o-2024-08-06")
+
+    def test_cached_pricing_is_read_only(self):
+        pricing = get_model_pricing("gpt-4o")
+        assert get_model_pricing("gpt-4o") is pricing
+        with pytest.raises(TypeError):
+            pricing["input"] = 0.0  # type: ignore[index]
+
+    def test_pricing_table_is_frozen(self):
+        # Lookup tables are derived from PRICING at import, so runtime edits
+        # must fail loudly rather than leave them disagreeing.
+        with pytest.raises(TypeError):
+            PRICING["my-model"] = {"input": 1.0, "output": 1.0}  # type: ignore[index]
+        with pytest.raises(TypeError):
+            PRICING["gpt-4o"]["input"] = 99.0  # type: ignore[index]
+        assert get_model_pricing("gpt-4o") is PRICING["gpt-4o"]
+
     def test_all_pricing_keys_resolve(self):
         """Every model in PRICING should resolve to itself."""
         for model in PRICING:
@@ -80,3 +161,8 @@ class TestDetectProvider:
 
     def test_unknown_returns_unknown(self):
         assert detect_provider("some-random-model") == "unknown"
+
+    def test_prefix_match_is_case_insensitive(self):
+        assert detect_provider("Claude-Custom-Finetune") == "anthropic"
+        assert detect_provider("O3-preview") == "openai"
+        assert detect_provider("gpt") == "unknown"
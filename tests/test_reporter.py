@@ -1,5 +1,7 @@
 """Tests for llm_spend.reporter."""
 
+import subprocess
+import sys
 from io import StringIO
 from unittest.mock import patch
 
@@ -98,11 +100,13 @@ def sample_total():
 # ---------------------------------------------------------------------------
 
 
-def _capture_report(fn, *args, **kwargs) -> str:
+def _capture_report(fn, *args, terminal=False, **kwargs) -> str:
     """Run a reporter function with a wide captured console and return text output."""
     buf = StringIO()
     # Use a wide console (width=300) so Rich does not truncate cell values.
-    test_console = Console(file=buf, highlight=False, markup=False, width=300)
+    test_console = Console(
+        file=buf, highlight=False, markup=False, width=300, force_terminal=terminal
+    )
     with patch.object(reporter_module, "console", test_console):
         fn(*args, **kwargs)
     return buf.getvalue()
@@ -127,6 +131,36 @@ class TestReportByFile:
         output = _capture_report(report_by_file, [])
         assert output is not None  # should not raise
 
+    def test_rows_are_preformatted(self, sample_file_data):
+        rows = reporter_module._format_rows("file", sample_file_data)
+        assert rows[0] == ("src/summarizer.py", "10", "50,000", "10,000", "$0.2750")
+
+    def test_plain_output_when_not_a_terminal(self, sample_file_data):
+        output = _capture_report(report_by_file, sample_file_data)
+        title, header, *rows = output.splitlines()
+        assert title == "Cost by File"
+        assert rows[0].split() == ["src/summarizer.py", "10", "50,000", "10,000", "$0.2750"]
+        # Fixed-width columns: numeric cells line up on the right edge.
+        assert len({len(line) for line in [header, *rows]}) == 1
+
+    def test_rich_table_on_a_terminal(self, sample_file_data):
+        output = _capture_report(report_by_file, sample_file_data, terminal=True)
+        assert "Cost by File" in output
+        assert "┃" in output or "│" in output
+        assert "src/summarizer.py" in output
+
+    def test_rich_table_under_jupyter(self, sample_file_data, monkeypatch):
+        import rich.jupyter
+
+        shown = []
+        monkeypatch.setattr(rich.jupyter, "display", lambda segments, text: shown.append(text))
+        notebook = Console(force_jupyter=True, width=300)
+        with patch.object(reporter_module, "console", notebook):
+            report_by_file(sample_file_data)
+        output = "".join(shown)
+        assert "Cost by File" in output
+        assert "┃" in output or "│" in output
+
 
 class TestReportByFunction:
     def test_renders_without_error(self, sample_function_data):
@@ -190,3 +224,31 @@ class TestListModels:
         output = _capture_report(list_models, PRICING)
         # Should contain at least one price value from the table
         assert "$" in output
+
+    def test_plain_output_has_one_line_per_model(self):
+        output = _capture_report(list_models, PRICING)
+        # Title and header, then one row per model.
+        assert len(output.splitlines()) == len(PRICING) + 2
+        assert ["gpt-4o", "openai", "$2.5000", "$10.0000"] in [
+            line.split() for line in output.splitlines()
+        ]
+
+    def test_rich_table_on_a_terminal(self):
+        output = _capture_report(list_models, PRICING, terminal=True)
+        assert "Supported Models" in output
+        for model in PRICING:
+            assert model in output
+
+
+class TestLazyConsole:
+    def test_import_does_not_load_rich(self):
+        code = "import sys, llm_spend.reporter; print('rich' in sys.modules)"
+        result = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        )
+        assert result.stdout.strip() == "False"
+
+    def test_console_created_once(self, monkeypatch):
+        monkeypatch.setattr(reporter_module, "console", None)
+        first = reporter_module.get_console()
+        assert reporter_module.get_console() is first
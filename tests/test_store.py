@@ -1,9 +1,16 @@
 """Tests for llm_spend.store."""
 
+import json
+import os
+import signal
+import sqlite3
+import threading
+import time
 from pathlib import Path
 
 import pytest
 
+from llm_spend import store as store_module
 from llm_spend.store import SpendStore
 
 
@@ -13,6 +20,23 @@ def store(tmp_path: Path) -> SpendStore:
     return SpendStore(db_path=tmp_path / "test_spend.db")
 
 
+def _log(store: SpendStore, **overrides) -> int:
+    """Log a small gpt-4o call, with any fields overridden."""
+    fields = dict(
+        provider="openai",
+        model="gpt-4o",
+        label=None,
+        file=None,
+        function=None,
+        input_tokens=100,
+        output_tokens=50,
+        cost_usd=0.001,
+        duration_ms=5.0,
+    )
+    fields.update(overrides)
+    return store.log_call(**fields)
+
+
 class TestLogCall:
     def test_log_call_stores_record(self, store: SpendStore):
         row_id = store.log_call(
@@ -82,6 +106,20 @@ class TestGetByFile:
         assert rows[0]["cost_usd"] == pytest.approx(0.03, rel=1e-6)
 
 
+class TestGetByModel:
+    def test_reports_provider_recorded_at_write_time(self, store: SpendStore):
+        # The same model served by two providers stays two rows, with the
+        # provider exactly as logged rather than re-derived from the name.
+        _log(store, provider="azure")
+        _log(store, provider="openai")
+        _log(store, provider="openai")
+        rows = store.get_by_model(days=1)
+        assert [(r["model"], r["provider"], r["calls"]) for r in rows] == [
+            ("gpt-4o", "openai", 2),
+            ("gpt-4o", "azure", 1),
+        ]
+
+
 class TestGetTotal:
     def test_sums_correctly(self, store: SpendStore):
         for i in range(5):
@@ -166,3 +204,381 @@ class TestExportCsv:
         assert Path(out).exists()
         content = Path(out).read_text()
         assert "gpt-4o" in content
+
+    def test_export_csv_spans_chunks(self, store: SpendStore, tmp_path: Path, monkeypatch):
+        monkeypatch.setattr(store_module, "_EXPORT_CHUNK", 2)
+        for _ in range(5):
+            _log(store)
+        out = tmp_path / "export.csv"
+        assert store.export_csv(str(out)) == 5
+        assert len(out.read_text().splitlines()) == 6
+
+
+class TestBatching:
+    def test_buffered_calls_flushed_on_read(self, tmp_path: Path):
+        store = SpendStore(db_path=tmp_path / "batch.db", batch_size=10)
+        assert [_log(store) for _ in range(3)] == [1, 2, 3]
+        assert len(store._pending) == 3
+        assert store.get_total(days=1)["total_calls"] == 3
+        assert store._pending == []
+
+    def test_flushes_when_batch_full(self, tmp_path: Path):
+        store = SpendStore(db_path=tmp_path / "batch.db", batch_size=2)
+        _log(store)
+        _log(store)
+        assert store._pending == []
+
+    def test_failed_batch_is_rolled_back(self, store: SpendStore):
+        good = (1, "openai", "gpt-4o", None, None, None, 10, 5, 1_000_000, 1.0, None)
+        bad = (1, "openai", None, None, None, None, 10, 5, 1_000_000, 1.0, None)
+        with pytest.raises(sqlite3.IntegrityError):
+            store.log_calls_batch([good, bad])
+        assert not store.conn.in_transaction
+        assert store.get_total(days=365 * 100)["total_calls"] == 0
+
+    def test_log_calls_batch(self, store: SpendStore):
+        timestamp = int(time.time() * 1_000_000)
+        row = (timestamp, "openai", "gpt-4o", None, None, None, 10, 5, 1_000_000, 1.0, None)
+        last_id = store.log_calls_batch([row, row, row])
+        assert last_id == 3
+        calls = store.get_all_calls(days=1)
+        assert [c["timestamp"] for c in calls] == [timestamp] * 3
+        assert store.get_total(days=1)["total_cost"] == pytest.approx(0.003)
+
+
+class TestClose:
+    def test_close_flushes_buffered_calls(self, tmp_path: Path):
+        store = SpendStore(db_path=tmp_path / "batch.db", batch_size=10)
+        _log(store)
+        store.close()
+        assert SpendStore(db_path=tmp_path / "batch.db").get_total(days=1)["total_calls"] == 1
+
+
+class TestConnection:
+    def test_connection_is_reused(self, store: SpendStore):
+        assert store.conn is store.conn
+
+    def test_close_reopens_on_next_use(self, store: SpendStore):
+        first = store.conn
+        store.close()
+        assert store.conn is not first
+        assert store.get_total(days=1)["total_calls"] == 0
+
+
+class TestIndexes:
+    @pytest.mark.parametrize(
+        "sql, index",
+        [
+            (store_module._SELECT_TOTAL, "idx_calls_ts"),  # any of them covers the sums
+            (store_module._SELECT_BY_FILE, "idx_calls_ts_file"),
+            (store_module._SELECT_BY_FUNCTION, "idx_calls_ts_function"),
+            (store_module._SELECT_BY_LABEL, "idx_calls_ts_label"),
+            (store_module._SELECT_BY_MODEL, "idx_calls_ts_model"),
+        ],
+    )
+    def test_reports_use_covering_index(self, store: SpendStore, sql: str, index: str):
+        plan = store.conn.execute("EXPLAIN QUERY PLAN " + sql, (0,)).fetchall()
+        detail = " ".join(row["detail"] for row in plan)
+        assert f"SEARCH calls USING COVERING INDEX {index}" in detail
+
+    def test_export_streams_in_key_order(self, store: SpendStore):
+        plan = store.conn.execute("EXPLAIN QUERY PLAN " + store_module._SELECT_EXPORT, (0,))
+        detail = " ".join(row["detail"] for row in plan)
+        assert "SEARCH calls USING PRIMARY KEY (timestamp>?)" in detail
+        assert "TEMP B-TREE" not in detail
+
+    def test_summary_reads_indexes_without_materializing(self, store: SpendStore):
+        plan = store.conn.execute("EXPLAIN QUERY PLAN " + store_module._SELECT_SUMMARY, (0,))
+        detail = " ".join(row["detail"] for row in plan)
+        assert "MATERIALIZE" not in detail
+        assert "COVERING INDEX idx_calls_ts_file" in detail
+        assert "COVERING INDEX idx_calls_ts_model" in detail
+
+
+class TestClustering:
+    def test_calls_table_is_clustered_on_time(self, store: SpendStore):
+        (sql,) = store.conn.execute("SELECT sql FROM sqlite_master WHERE name = 'calls'").fetchone()
+        assert "WITHOUT ROWID" in sql
+        plan = store.conn.execute("EXPLAIN QUERY PLAN " + store_module._SELECT_WINDOW, (0,))
+        assert "SEARCH calls USING PRIMARY KEY (timestamp>?)" in [r["detail"] for r in plan]
+
+    def test_ids_follow_current_maximum(self, store: SpendStore):
+        assert _log(store) == 1
+        assert (
+            store.log_calls_batch([(1, "openai", "o1", None, None, None, 1, 1, 0, 0.0, None)] * 3)
+            == 4
+        )
+        assert sorted(r["id"] for r in store.get_all_calls(days=365 * 100)) == [1, 2, 3, 4]
+
+    def test_migrates_rowid_table(self, tmp_path: Path):
+        db_path = tmp_path / "rowid.db"
+        conn = sqlite3.connect(db_path)
+        conn.execute(
+            "CREATE TABLE calls (id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp INTEGER NOT NULL,"
+            " provider TEXT NOT NULL, model TEXT NOT NULL, label TEXT, file TEXT, function TEXT,"
+            " input_tokens INTEGER NOT NULL DEFAULT 0, output_tokens INTEGER NOT NULL DEFAULT 0,"
+            " cost_nano INTEGER NOT NULL DEFAULT 0, duration_ms REAL NOT NULL DEFAULT 0.0,"
+            " metadata_json TEXT)"
+        )
+        conn.execute(
+            "INSERT INTO calls (id, timestamp, provider, model) VALUES (?, ?, ?, ?)",
+            (5, 1_577_836_801_500_000, "openai", "gpt-4o"),
+        )
+        conn.commit()
+        conn.close()
+
+        store = SpendStore(db_path=db_path)
+        assert _log(store) == 6
+        assert [r["id"] for r in store.get_all_calls(days=365 * 100)] == [6, 5]
+
+
+class TestTimestamps:
+    def test_timestamp_stored_as_epoch_microseconds(self, store: SpendStore):
+        _log(store)
+        (call,) = store.get_all_calls(days=1)
+        assert isinstance(call["timestamp"], int)
+        assert call["timestamp"] > 1_600_000_000 * 1_000_000
+
+    def test_days_window_excludes_older_calls(self, store: SpendStore):
+        _log(store)
+        now = store.get_all_calls(days=1)[0]["timestamp"]
+        old = now - 3 * store_module._MICROS_PER_DAY
+        store.log_calls_batch([(old, "openai", "gpt-4o", None, None, None, 1, 1, 0, 0.0, None)])
+        assert store.get_total(days=2)["total_calls"] == 1
+        assert store.get_total(days=4)["total_calls"] == 2
+        assert store.clear(days=2) == 1
+
+    def test_migrates_iso_text_timestamps(self, tmp_path: Path):
+        db_path = tmp_path / "old.db"
+        conn = sqlite3.connect(db_path)
+        conn.execute(
+            "CREATE TABLE calls (id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT NOT NULL,"
+            " provider TEXT NOT NULL, model TEXT NOT NULL, label TEXT, file TEXT, function TEXT,"
+            " input_tokens INTEGER NOT NULL DEFAULT 0, output_tokens INTEGER NOT NULL DEFAULT 0,"
+            " cost_usd REAL NOT NULL DEFAULT 0.0, duration_ms REAL NOT NULL DEFAULT 0.0,"
+            " metadata_json TEXT)"
+        )
+        conn.execute(
+            "INSERT INTO calls (timestamp, provider, model, input_tokens, cost_usd)"
+            " VALUES (?, ?, ?, ?, ?)",
+            ("2020-01-01T00:00:01.500000+00:00", "openai", "gpt-4o", 42, 0.0125),
+        )
+        conn.commit()
+        conn.close()
+
+        store = SpendStore(db_path=db_path)
+        (call,) = store.get_all_calls(days=365 * 100)
+        assert call["timestamp"] == 1_577_836_801_500_000
+        assert call["input_tokens"] == 42
+        assert call["cost_usd"] == 0.0125
+        columns = {r[1] for r in store.conn.execute("PRAGMA table_info(calls)")}
+        assert "cost_nano" in columns and "cost_usd" not in columns
+
+    def test_concurrent_migration_runs_once(self, tmp_path: Path, monkeypatch):
+        db_path = tmp_path / "old.db"
+        conn = sqlite3.connect(db_path)
+        conn.execute(
+            "CREATE TABLE calls (id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT NOT NULL,"
+            " provider TEXT NOT NULL, model TEXT NOT NULL, label TEXT, file TEXT, function TEXT,"
+            " input_tokens INTEGER NOT NULL DEFAULT 0, output_tokens INTEGER NOT NULL DEFAULT 0,"
+            " cost_usd REAL NOT NULL DEFAULT 0.0, duration_ms REAL NOT NULL DEFAULT 0.0,"
+            " metadata_json TEXT)"
+        )
+        conn.execute(
+            "INSERT INTO calls (timestamp, provider, model) VALUES (?, ?, ?)",
+            ("2020-01-01T00:00:01+00:00", "openai", "gpt-4o"),
+        )
+        conn.commit()
+        conn.close()
+        SpendStore(db_path=db_path)  # first process migrates
+
+        # A second process that checked the schema before the first one
+        # migrated still sees the stale answer on its unlocked check.
+        stale = iter([store_module._migration(store_module._TEXT_TIMESTAMP_TO_MICROS, "x")])
+        pending = store_module._pending_migration
+        monkeypatch.setattr(
+            store_module, "_pending_migration", lambda conn: next(stale, None) or pending(conn)
+        )
+        store = SpendStore(db_path=db_path)
+        (call,) = store.get_all_calls(days=365 * 100)
+        assert call["timestamp"] == 1_577_836_801_000_000
+
+    def test_export_renders_iso_timestamps(self, store: SpendStore, tmp_path: Path):
+        _log(store)
+        out = tmp_path / "export.json"
+        store.export_json(str(out))
+        assert "T" in json.loads(out.read_text())[0]["timestamp"]
+
+    def test_export_keeps_microseconds(self, store: SpendStore, tmp_path: Path):
+        store.log_calls_batch(
+            [(1_577_836_801_000_042, "openai", "o1", None, None, None, 1, 1, 0, 0.0, None)]
+        )
+        out = tmp_path / "export.json"
+        store.export_json(str(out))
+        assert json.loads(out.read_text())[0]["timestamp"] == "2020-01-01T00:00:01.000042Z"
+
+
+class TestGetSummary:
+    def test_totals_and_top_consumers(self, store: SpendStore):
+        for file, model, cost in [("a.py", "gpt-4o", 0.01), ("b.py", "o1", 0.05)]:
+            store.log_call(
+                provider="openai",
+                model=model,
+                label=None,
+                file=file,
+                function=None,
+                input_tokens=100,
+                output_tokens=50,
+                cost_usd=cost,
+                duration_ms=5.0,
+            )
+        summary = store.get_summary(days=1)
+        assert summary["total_calls"] == 2
+        assert summary["total_cost"] == pytest.approx(0.06, rel=1e-6)
+        assert summary["total_input"] == 200
+        assert summary["top_file"] == "b.py"
+        assert summary["top_model"] == "o1"
+
+    def test_total_cost_is_exact(self, store: SpendStore):
+        for _ in range(10):
+            _log(store, cost_usd=0.1)
+        assert store.get_total(days=1)["total_cost"] == 1.0
+
+    def test_empty_store(self, store: SpendStore):
+        summary = store.get_summary(days=30)
+        assert summary["total_calls"] == 0
+        assert summary["top_file"] is None
+        assert summary["top_model"] is None
+
+
+class TestExportJson:
+    def test_export_json_roundtrip(self, store: SpendStore, tmp_path: Path):
+        for _ in range(3):
+            _log(store)
+        out = tmp_path / "export.json"
+        assert store.export_json(str(out)) == 3
+        rows = json.loads(out.read_text())
+        assert len(rows) == 3
+        assert rows[0]["model"] == "gpt-4o"
+
+    def test_export_json_empty(self, store: SpendStore, tmp_path: Path):
+        out = tmp_path / "export.json"
+        assert store.export_json(str(out)) == 0
+        assert json.loads(out.read_text()) == []
+
+
+class TestBackgroundWriter:
+    def test_background_calls_visible_after_flush(self, tmp_path: Path):
+        store = SpendStore(db_path=tmp_path / "bg.db", background=True)
+        assert [_log(store) for _ in range(50)] == list(range(1, 51))
+        assert store.get_total(days=1)["total_calls"] == 50
+        store.close()
+
+    def test_writer_error_raised_on_flush(self, tmp_path: Path):
+        store = SpendStore(db_path=tmp_path / "bg.db", background=True)
+        _log(store, model=None)  # violates NOT NULL
+        with pytest.raises(sqlite3.IntegrityError):
+            store.flush()
+        store.flush()  # the error is reported once
+        store.close()
+
+    def test_close_drains_queue_and_stops_writer(self, tmp_path: Path):
+        before = threading.active_count()
+        store = SpendStore(db_path=tmp_path / "bg.db", background=True)
+        for _ in range(5):
+            _log(store)
+        store.close()
+        assert threading.active_count() == before
+        reader = SpendStore(db_path=tmp_path / "bg.db")
+        assert reader.get_total(days=1)["total_calls"] == 5
+
+    @pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+    @pytest.mark.filterwarnings("ignore::DeprecationWarning")  # fork with threads, 3.12+
+    def test_forked_child_writes_its_calls(self, tmp_path: Path):
+        store = SpendStore(db_path=tmp_path / "bg.db", background=True)
+        _log(store, label="parent")
+        store.flush()
+        pid = os.fork()
+        if pid == 0:  # pragma: no cover - runs in the child
+            code = 1
+            try:
+                signal.alarm(10)  # fail rather than hang
+                _log(store, label="child")
+                store.flush()
+                code = 0
+            finally:
+                os._exit(code)
+        _, status = os.waitpid(pid, 0)
+        assert os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0
+        labels = sorted(r["label"] for r in store.get_all_calls(days=1))
+        assert labels == ["child", "parent"]
+        store.close()
+
+
+class TestArrays:
+    def test_get_all_calls_arrays(self, store: SpendStore):
+        np = pytest.importorskip("numpy")
+        _log(store, model="gpt-4o", input_tokens=10)
+        _log(store, model="o1", input_tokens=20)
+        _log(store, model="gpt-4o", input_tokens=30)
+        arrays = store.get_all_calls_arrays(days=1)
+        assert arrays["models"] == ["gpt-4o", "o1"]
+        assert arrays["model_id"].tolist() == [0, 1, 0]
+        assert arrays["input_tokens"].tolist() == [10, 20, 30]
+        assert arrays["cost_usd"].dtype == np.float64
+
+
+class TestMetadata:
+    def test_metadata_round_trips_through_json(self, store: SpendStore):
+        _log(store, metadata={"request_id": "abc", "retries": 2})
+        (call,) = store.get_all_calls(days=1)
+        assert json.loads(call["metadata_json"]) == {"request_id": "abc", "retries": 2}
+
+    def test_json_fallback_without_orjson(self, monkeypatch):
+        monkeypatch.setattr(store_module, "orjson", None)
+        assert store_module._json_bytes({"a": [1, 2]}) == b'{"a":[1,2]}'
+
+    def test_json_non_str_keys(self):
+        assert store_module._json_bytes({1: "a"}) == b'{"1":"a"}'
+
+    def test_json_int_wider_than_64_bits(self):
+        assert json.loads(store_module._json_bytes({"n": 2**70})) == {"n": 2**70}
+
+
+class TestReadonly:
+    def test_readonly_store_reads(self, store: SpendStore):
+        _log(store)
+        reader = SpendStore(db_path=store.db_path, readonly=True)
+        assert reader.get_total(days=1)["total_calls"] == 1
+
+    def test_readonly_store_rejects_writes(self, store: SpendStore):
+        reader = SpendStore(db_path=store.db_path, readonly=True)
+        with pytest.raises(sqlite3.OperationalError):
+            _log(reader)
+
+    def test_readonly_store_creates_missing_db(self, tmp_path: Path):
+        reader = SpendStore(db_path=tmp_path / "new.db", readonly=True)
+        assert reader.get_total(days=1)["total_calls"] == 0
+
+
+class TestSnapshot:
+    def test_totals_are_exact(self, store: SpendStore):
+        for _ in range(10):
+            _log(store, file="a.py", cost_usd=0.1)
+        snap = store.snapshot(days=1)
+        assert snap.total()["total_cost"] == store.get_total(days=1)["total_cost"] == 1.0
+        assert snap.by("file")[0]["cost_usd"] == 1.0
+
+    def test_matches_sql_aggregates(self, store: SpendStore):
+        _log(store, file="a.py", function="f", cost_usd=0.01)
+        _log(store, file="a.py", function="g", cost_usd=0.02)
+        _log(store, file=None, label="x", cost_usd=0.05)
+        snap = store.snapshot(days=1)
+
+        assert snap.total() == pytest.approx(store.get_total(days=1))
+        by_file = snap.by("file")
+        assert [r["file"] for r in by_file] == ["(unknown)", "a.py"]
+        assert by_file[1]["calls"] == 2
+        assert by_file[1]["cost_usd"] == pytest.approx(0.03)
+        assert [r["label"] for r in snap.by("label")] == ["x", "(unlabeled)"]
+        assert len(snap.by("function", "file")) == 3
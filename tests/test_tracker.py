@@ -76,6 +76,17 @@ class TestExtractTokens:
         assert inp == 60
         assert out == 30
 
+    def test_alternating_shapes_of_one_type(self):
+        # Both helpers build SimpleNamespace usage, so the cached getter for
+        # that type must be re-probed when the shape changes.
+        for _ in range(2):
+            assert _extract_tokens(_openai_response(10, 5)) == (10, 5)
+            assert _extract_tokens(_anthropic_response(7, 3)) == (7, 3)
+
+    def test_partial_usage(self):
+        assert _extract_tokens({"usage": {"input_tokens": 12}}) == (12, 0)
+        assert _extract_tokens({"usage": "n/a"}) == (0, 0)
+
 
 class TestExtractModel:
     def test_extracts_model_attribute(self):
@@ -91,6 +102,10 @@ class TestExtractModel:
     def test_dict_style(self):
         assert _extract_model({"model": "gemini-1.5-pro"}) == "gemini-1.5-pro"
 
+    def test_dict_without_model(self):
+        assert _extract_model({"usage": {}}) is None
+        assert _extract_model({"model": "o1"}) == "o1"
+
 
 # ---------------------------------------------------------------------------
 # _detect_provider (via tracker)
@@ -140,6 +155,39 @@ class TestTrackDecorator:
         result = my_api_call()
         assert result == {"result": "hello"}
 
+    def test_track_decorator_skips_empty_usage(self, mock_store: SpendStore):
+        @track(model="gpt-4o")
+        def my_api_call():
+            return {"result": "hello"}
+
+        my_api_call()
+        assert mock_store.get_total(days=1)["total_calls"] == 0
+
+    def test_track_decorator_skip_never_touches_store(self, monkeypatch):
+        monkeypatch.setattr(tracker_module, "_get_store", lambda: pytest.fail("store used"))
+
+        @track(model="gpt-4o")
+        def my_api_call():
+            return _openai_response(prompt_tokens=0, completion_tokens=0)
+
+        my_api_call()
+
+    def test_track_decorator_logs_empty_labelled_call(self, mock_store: SpendStore):
+        @track(model="gpt-4o", label="stream")
+        def my_api_call():
+            return {"result": "hello"}
+
+        my_api_call()
+        assert mock_store.get_total(days=1)["total_calls"] == 1
+
+    def test_track_decorator_log_empty(self, mock_store: SpendStore):
+        @track(model="gpt-4o", log_empty=True)
+        def my_api_call():
+            return {"result": "hello"}
+
+        my_api_call()
+        assert mock_store.get_total(days=1)["total_calls"] == 1
+
     def test_track_decorator_uses_response_model(self, mock_store: SpendStore):
         @track(model="gpt-4o")
         def my_api_call():
@@ -150,6 +198,17 @@ class TestTrackDecorator:
         calls = mock_store.get_all_calls(days=1)
         assert calls[0]["model"] == "gpt-4o-mini"
 
+    def test_track_decorator_records_caller(self, mock_store: SpendStore):
+        @track(model="gpt-4o")
+        def my_api_call():
+            return _openai_response()
+
+        my_api_call()
+
+        call = mock_store.get_all_calls(days=1)[0]
+        assert call["file"] == __file__
+        assert call["function"] == "test_track_decorator_records_caller"
+
     def test_track_decorator_calculates_cost(self, mock_store: SpendStore):
         @track(model="gpt-4o")
         def my_api_call():
@@ -188,6 +247,30 @@ class TestSpendingContextManager:
         total = mock_store.get_total(days=1)
         assert total["total_cost"] == pytest.approx(18.00, rel=1e-6)
 
+    def test_spending_records_caller(self, mock_store: SpendStore):
+        with spending("gpt-4o") as s:
+            s.input_tokens = 10
+
+        call = mock_store.get_all_calls(days=1)[0]
+        assert call["file"] == __file__
+        assert call["function"] == "test_spending_records_caller"
+
+    def test_spending_skips_empty_block(self, mock_store: SpendStore):
+        with spending("gpt-4o"):
+            pass
+        with spending("gpt-4o", log_empty=True):
+            pass
+
+        assert mock_store.get_total(days=1)["total_calls"] == 1
+
+    def test_spending_logs_empty_labelled_block(self, mock_store: SpendStore):
+        with spending("gpt-4o", label="warmup"):
+            pass
+
+        (call,) = mock_store.get_all_calls(days=1)
+        assert call["label"] == "warmup"
+        assert call["input_tokens"] == 0
+
     def test_spending_logs_even_on_exception(self, mock_store: SpendStore):
         with pytest.raises(ValueError):
             with spending("gpt-4o", label="err") as s: